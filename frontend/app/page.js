@@ -86,12 +86,28 @@ export default function Home() {
         setSaving(true);
         try {
             // Save combined config (animations, strips, and projection.floor)
-            const configRes = await fetch("/api/config/", {
-                method: "PUT",
-                headers: { "Content-Type": "application/json" },
-                body: JSON.stringify(config),
-            });
+            const put = (force) =>
+                fetch(`/api/config/${force ? "?force=true" : ""}`, {
+                    method: "PUT",
+                    headers: { "Content-Type": "application/json" },
+                    body: JSON.stringify(config),
+                });
+            let configRes = await put(false);
+
+            // The backend rejects configs estimated far below the target frame rate
+            if (configRes.status === 422) {
+                const { detail } = await configRes.json();
+                if (!detail?.estimate) throw new Error("Invalid config");
+                if (
+                    !confirm(
+                        `${detail.message} (${detail.estimate.frame_ms} ms per frame). Save anyway?`,
+                    )
+                )
+                    return;
+                configRes = await put(true);
+            }
             if (!configRes.ok) throw new Error("Failed to save config");
+            const { estimate } = await configRes.json();
 
             // Reload config to confirm
             const newConfigRes = await fetch("/api/config/");
@@ -99,7 +115,17 @@ export default function Home() {
 
             setConfig(newConfig);
             setRawConfigString(JSON.stringify(newConfig, null, 2));
-            showSnackbar("Configuration saved successfully!", "success");
+            if (estimate && estimate.status !== "ok") {
+                showSnackbar(
+                    `Saved, but estimated ${estimate.fps} fps is below the target of ${estimate.target_fps} fps`,
+                    "error",
+                );
+            } else {
+                showSnackbar(
+                    `Configuration saved successfully! (~${estimate?.fps} fps)`,
+                    "success",
+                );
+            }
         } catch (e) {
             showSnackbar("Error saving configuration: " + e.message, "error");
         } finally {
@@ -42,45 +42,98 @@ export default function Visualization({ config }) {
         return () => observer.disconnect();
     }, [floorWidth, floorHeight]);
 
-    // Image Refresh Loop with Double Buffering
+    // Live Image as MJPEG Stream (one long-lived request per view)
+    const streamSrc = () =>
+        `/api/visualization/stream?view=${
+            viewMode === "mapped" ? "live_mapped" : "live"
+        }&quality=80&t=${Date.now()}`;
+
     useEffect(() => {
-        if (!showImage) return;
+        setImageSrc(showImage ? streamSrc() : "");
+    }, [showImage, viewMode]);
 
+    // Live Data Stream (binary LED frames, objects and stats)
+    const liveRef = useRef({ layout: null, frame: null, objects: [] });
+
+    useEffect(() => {
+        let ws;
+        let reconnectId;
         let isMounted = true;
-        let timeoutId;
-
-        const loadNextImage = () => {
-            const endpoint =
-                viewMode === "mapped"
-                    ? "/api/visualization/live_mapped"
-                    : "/api/visualization/live";
-            const nextSrc = `${endpoint}?t=${Date.now()}`;
-            const img = new Image();
-
-            img.onload = () => {
-                if (isMounted) {
-                    setImageSrc(nextSrc);
-                    timeoutId = setTimeout(loadNextImage, 200);
+        let lastStats = 0;
+
+        const connect = () => {
+            const protocol =
+                window.location.protocol === "https:" ? "wss" : "ws";
+            ws = new WebSocket(
+                `${protocol}://${window.location.host}/api/data/ws?fps=30`,
+            );
+            ws.binaryType = "arraybuffer";
+
+            ws.onmessage = (event) => {
+                const live = liveRef.current;
+
+                if (typeof event.data === "string") {
+                    const message = JSON.parse(event.data);
+                    if (message.type === "layout") {
+                        // LED index -> byte offset in a frame
+                        live.layout = new Map(
+                            message.leds.map((index, i) => [index, i * 5]),
+                        );
+                        live.frame = null;
+                    } else if (message.type === "stats") {
+                        live.objects = message.objects;
+                        const now = Date.now();
+                        if (now - lastStats > 250) {
+                            lastStats = now;
+                            const { type, objects, ...stats } = message;
+                            setStats(stats);
+                        }
+                    }
+                    return;
                 }
-            };
 
-            img.onerror = () => {
-                if (isMounted) {
-                    // On error, keep existing image and try again
-                    timeoutId = setTimeout(loadNextImage, 200);
+                // <type: u8> <frame number: u32> <payload>
+                const view = new DataView(event.data);
+                const payload = new Uint8Array(event.data, 5);
+
+                if (view.getUint8(0) === 0) {
+                    live.frame = payload.slice();
+                } else if (live.frame) {
+                    // Delta: <skip: u32> <len: u32> <bytes> records
+                    let position = 0;
+                    let i = 0;
+                    while (i < payload.length) {
+                        const records = new DataView(
+                            payload.buffer,
+                            payload.byteOffset + i,
+                            8,
+                        );
+                        position += records.getUint32(0, true);
+                        const length = records.getUint32(4, true);
+                        i += 8;
+                        live.frame.set(
+                            payload.subarray(i, i + length),
+                            position,
+                        );
+                        i += length;
+                        position += length;
+                    }
                 }
             };
 
-            img.src = nextSrc;
+            ws.onclose = () => {
+                if (isMounted) reconnectId = setTimeout(connect, 1000);
+            };
         };
 
-        loadNextImage();
+        connect();
 
         return () => {
             isMounted = false;
-            clearTimeout(timeoutId);
+            clearTimeout(reconnectId);
+            ws.close();
         };
-    }, [showImage, viewMode]);
+    }, []);
 
     // Canvas Render Loop
     useEffect(() => {
@@ -91,22 +144,11 @@ export default function Visualization({ config }) {
         let animationFrameId;
         let isRunning = true;
 
-        const render = async () => {
-            // Fetch Data
+        const render = () => {
             try {
-                const [ledsRes, objectsRes, fpsRes] = await Promise.all([
-                    fetch("/api/data/leds"),
-                    fetch("/api/data/objects"),
-                    fetch("/api/data/fps"),
-                ]);
-
-                if (!isRunning) return;
-
-                const leds = showColors ? await ledsRes.json() : {};
-                const objects = showObjects ? await objectsRes.json() : [];
-                const fpsData = await fpsRes.json();
-
-                setStats(fpsData);
+                const live = liveRef.current;
+                const frame = showColors ? live.frame : null;
+                const objects = showObjects ? live.objects : [];
 
                 // Clear
                 ctx.clearRect(0, 0, canvas.width, canvas.height);
@@ -138,23 +180,15 @@ export default function Visualization({ config }) {
                         const y = strip.start[1] + dy * i;
                         const ledIndex = strip.index + i;
 
-                        // Draw LED
-                        const color = leds[ledIndex];
-                        if (color) {
+                        // Draw LED (frame channels: r, g, b, ww, cw)
+                        const offset = live.layout?.get(ledIndex);
+                        if (frame && offset !== undefined) {
                             // Simple RGB approximation from RGBCCT
                             // CCT is ignored for visualization simplicity, or added as white overlay
-                            const r = Math.min(
-                                255,
-                                color.r + color.cw + color.ww,
-                            );
-                            const g = Math.min(
-                                255,
-                                color.g + color.cw + color.ww,
-                            );
-                            const b = Math.min(
-                                255,
-                                color.b + color.cw + color.ww,
-                            );
+                            const white = frame[offset + 3] + frame[offset + 4];
+                            const r = Math.min(255, frame[offset] + white);
+                            const g = Math.min(255, frame[offset + 1] + white);
+                            const b = Math.min(255, frame[offset + 2] + white);
                             ctx.fillStyle = `rgb(${r},${g},${b})`;
                         } else {
                             ctx.fillStyle = "#111";
@@ -234,6 +268,10 @@ export default function Visualization({ config }) {
                                     : "object-cover opacity-60"
                             }`}
                             alt="Live View"
+                            onError={() => {
+                                // Stream dropped, reconnect
+                                setTimeout(() => setImageSrc(streamSrc()), 1000);
+                            }}
                         />
                     )}
                     <canvas
@@ -1,43 +1,124 @@
 #!/usr/bin/env python3
 import argparse
 import asyncio
+import time
+from contextlib import contextmanager
 from pathlib import Path
+from typing import List, Tuple
 
-import uvicorn
 
-from modules import config
-from modules.api import app
-from modules.led_controller import LEDController
-from modules.state import STATE
-from modules.xovis.server import XOVISServer
+class StartupProfile:
+    """
+    Wall clock time of the startup steps, reported with --profile-startup
+    """
+
+    steps: List[Tuple[str, float, float]]  # Name, duration, time since start
+
+    def __init__(self) -> None:
+        self.start = time.perf_counter()
+        self.steps = []
+
+    @contextmanager
+    def step(self, name: str):
+        tic = time.perf_counter()
+        try:
+            yield
+        finally:
+            now = time.perf_counter()
+            self.steps.append((name, now - tic, now - self.start))
+
+    def report(self) -> None:
+        print(f"{'Step':<40} {'Time (ms)':>10} {'Since start (ms)':>17}")
+        for name, duration, elapsed in self.steps:
+            print(f"{name:<40} {duration * 1000:10.1f} {elapsed * 1000:17.1f}")
 
 
 async def main():
+    profile = StartupProfile()
+
     parser = argparse.ArgumentParser()
     parser.add_argument("--config", type=Path, help="Path to config.yaml")
+    parser.add_argument(
+        "--capture", type=Path, help="Append raw XOVIS pushes to this capture file"
+    )
+    parser.add_argument(
+        "--profile-startup",
+        action="store_true",
+        help="Report import and init time per startup step, then exit",
+    )
     args = parser.parse_args()
 
-    if args.config:
-        config.CONFIG.path = args.config
-        config.CONFIG.load()
-
     print("Starting components...")
 
-    # 1. LED Controller
-    STATE.led_controller = LEDController()
-    STATE.led_controller.start()
+    # 1. LED Controller, first so the floor lights up before anything else loads
+    with profile.step("import modules.config"):
+        from modules import config
+
+        if args.config:
+            config.CONFIG_PATH = args.config
+
+    with profile.step("load config"):
+        config.CONFIG  # Loaded on first access
+
+    with profile.step("import modules.led_controller"):
+        from modules.led_controller import LEDController
+        from modules.state import STATE
+
+    with profile.step("init LED controller"):
+        STATE.led_controller = LEDController()
+        STATE.led_controller.start()
+
+    if args.profile_startup:
+        with profile.step("first frame"):
+            while STATE.led_controller.frame_number == 0:
+                time.sleep(0.001)
+
+    with profile.step("start config watcher"):
+        from modules.config_watcher import ConfigWatcher
+
+        config_watcher = ConfigWatcher(config.CONFIG)
+        config_watcher.start()
 
     # 2. Xovis Server
-    xovis_server = XOVISServer()
-    STATE.xovis_server = xovis_server
-    xovis_server.subscribe_position(STATE.led_controller.update_objects)
+    with profile.step("import modules.xovis.server"):
+        from modules.xovis.server import XOVISServer
+
+    with profile.step("init XOVIS server"):
+        xovis_server = XOVISServer()
+        STATE.xovis_server = xovis_server
+        if args.capture:
+            xovis_server.start_capture(args.capture)
+
+        def apply_prediction(_scene=None):
+            STATE.led_controller.set_object_source(
+                xovis_server.tracks
+                if config.CONFIG.PREDICTION
+                else xovis_server.positions
+            )
+
+        apply_prediction()
+        config.CONFIG.add_listener(apply_prediction)
+
+        def update_api_objects(new_objects):
+            STATE.objects = new_objects
 
-    def update_api_objects(new_objects):
-        STATE.objects = new_objects
+        xovis_server.subscribe_position(update_api_objects)
 
-    xovis_server.subscribe_position(update_api_objects)
+        xovis_http_server = xovis_server.start_server()
 
-    xovis_http_server = xovis_server.start_server()
+    # 3. API
+    with profile.step("import modules.api"):
+        from modules.api import app
+
+    with profile.step("import uvicorn"):
+        import uvicorn
+
+    if args.profile_startup:
+        profile.report()
+        config_watcher.stop()
+        xovis_http_server.shutdown()
+        STATE.led_controller.stop()
+        return
 
     # --- Start Uvicorn (Blocking Mode) ---
     # We let Uvicorn control the loop. It handles Ctrl+C automatically.
@@ -56,8 +137,15 @@ async def main():
         # This block runs ALWAYS after Uvicorn finishes (or crashes)
         print("\nShutting down background components...")
 
+        try:
+            config_watcher.stop()
+            print("Config watcher stopped.")
+        except Exception as e:
+            print(f"Error stopping config watcher: {e}")
+
         try:
             xovis_http_server.shutdown()
+            xovis_server.stop_capture()
             print("XOVIS callback handler stopped.")
         except Exception as e:
             print(f"Error stopping Xovis: {e}")
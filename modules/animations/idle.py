@@ -67,6 +67,8 @@ def wave(
             ww=min(255, int(ww)),
         )
 
+    # Cycles per second, lets hold pick its interval
+    animation.rate = abs(speed) / wavelength
     return animation
 
 
@@ -107,6 +109,8 @@ def rainbow(speed: float = 0.1, spread: float = 3.0) -> Animation:
         r, g, b = _hsv_to_rgb(hue, 1.0, 1.0)
         return RGBCCT(r=r, g=g, b=b)
 
+    # Cycles per second, lets hold pick its interval
+    animation.rate = abs(speed)
     return animation
 
 
@@ -312,6 +316,8 @@ def plasma(speed: float = 0.5, scale: float = 0.05) -> Animation:
         r, g, b = _hsv_to_rgb(hue, 1.0, 1.0)
         return RGBCCT(r=r, g=g, b=b)
 
+    # Cycles per second, lets hold pick its interval
+    animation.rate = abs(speed)
     return animation
 
 
@@ -385,4 +391,6 @@ def linear_rainbow(
         r, g, b = _hsv_to_rgb(hue, 1.0, 1.0)
         return RGBCCT(r=r, g=g, b=b)
 
+    # Cycles per second, lets hold pick its interval
+    animation.rate = abs(speed)
     return animation
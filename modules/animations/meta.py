@@ -5,12 +5,36 @@ Meta-Animation Definitions
 
 import datetime
 from time import sleep
-from typing import Dict, Iterable, Literal, Tuple
+from typing import Dict, Iterable, Literal, Optional, Tuple
 
+import numpy as np
 from rpi_ws2805 import RGBCCT
 
 from ..helpers import interpolate_rgbcct
-from ..types import LED, Animation, Point, SceneContext
+from ..types import LED, Animation, LEDGeometry, Point, SceneContext
+
+# Samples per cycle of an animation's fastest change when hold picks its interval
+HOLD_SAMPLES_PER_CYCLE = 60
+# Relative change of the derived interval before hold switches to it
+HOLD_INTERVAL_TOLERANCE = 0.2
+
+
+def _rate_of(animation: Animation | RGBCCT) -> Optional[float]:
+    """
+    Declared rate of change of an animation in cycles per second, None if unknown
+    """
+
+    if isinstance(animation, RGBCCT):
+        return 0.0
+
+    return getattr(animation, "rate", None)
+
+
+def _max_rate(*animations: Animation | RGBCCT) -> Optional[float]:
+    rates = [_rate_of(anim) for anim in animations]
+    if None in rates:
+        return None
+    return max(rates, default=0.0)
 
 
 def alternate(
@@ -36,6 +60,7 @@ def alternate(
             else anim(time, _ctx, led, objects)
         )
 
+    animation.rate = _max_rate(*animations)
     return animation
 
 
@@ -70,6 +95,7 @@ def blend(
 
         return RGBCCT(r=result[0], g=result[1], b=result[2], cw=result[3], ww=result[4])
 
+    animation.rate = _max_rate(*animations)
     return animation
 
 
@@ -114,6 +140,7 @@ def schedule(
 
         return target(time, ctx, led, objects, *args, **kwargs)
 
+    animation.rate = _max_rate(primary, secondary)
     return animation
 
 
@@ -177,6 +204,9 @@ def smooth(
             ww=int(next_ww),
         )
 
+    func.rate = _rate_of(animation)
+    # Handed to the rebuilt node when the config is reloaded
+    func.state = last_colors
     return func
 
 
@@ -232,6 +262,8 @@ def persist(
         all_objects = [p for p, t in persisted_objects.values()]
         return animation(time, ctx, led, all_objects, *args, **kwargs)
 
+    # Handed to the rebuilt node when the config is reloaded
+    func.state = persisted_objects
     return func
 
 
@@ -382,3 +414,180 @@ def proximity_speed(
         )
 
     return _animation
+
+
+def hold(
+    animation: Animation | RGBCCT,
+    frames: int = 0,
+    interpolate: bool = False,
+) -> Animation:
+    """
+    Evaluates the animation for each LED only every `frames` frames and holds
+    its color in between. LEDs take turns, so every frame costs the same.
+    With frames = 0 the interval follows from the animation's declared rate of
+    change, animations without one are evaluated every frame.
+    interpolate fades from the previous to the last sample instead of stepping,
+    which delays the animation by one interval.
+    """
+    rate = _rate_of(animation)
+
+    # {led index: (previous color, last color, frame of last sample)}
+    samples: Dict[int, Tuple[RGBCCT, RGBCCT, int]] = {}
+    interval = max(frames, 1)
+    frame = 0
+    last_frame_time: Optional[float] = None
+    frame_duration = 0.0
+
+    def func(
+        time: float,
+        ctx: SceneContext,
+        led: LED,
+        objects: Iterable[Point],
+        *args,
+        **kwargs,
+    ) -> RGBCCT:
+        nonlocal interval, frame, last_frame_time, frame_duration
+
+        # --- This logic should only run once per frame ---
+        if time != last_frame_time:
+            if last_frame_time is not None:
+                frame += 1
+                dt = time - last_frame_time
+                frame_duration = (
+                    dt if frame_duration == 0 else frame_duration * 0.9 + dt * 0.1
+                )
+
+                if frames == 0 and rate and frame_duration > 0:
+                    period = 1.0 / (rate * HOLD_SAMPLES_PER_CYCLE)
+                    target = max(int(period / frame_duration), 1)
+                    # Only follow larger changes, jitter in the frame time
+                    # would otherwise move the interval back and forth
+                    if abs(target - interval) > HOLD_INTERVAL_TOLERANCE * interval:
+                        interval = target
+
+            last_frame_time = time
+        # --- End of per-frame logic ---
+
+        sample = samples.get(led.index)
+
+        # LEDs take turns by index, and resample at the latest one interval
+        # after their last sample should the interval have changed since
+        if (
+            sample is None
+            or (frame + led.index) % interval == 0
+            or frame - sample[2] >= interval
+        ):
+            color = (
+                animation
+                if isinstance(animation, RGBCCT)
+                else animation(time, ctx, led, objects, *args, **kwargs)
+            )
+
+            if sample is None:
+                sample = (color, color, frame)
+            else:
+                sample = (sample[1], color, frame)
+            samples[led.index] = sample
+
+        previous, last, sampled = sample
+
+        if not interpolate or previous == last:
+            return last
+
+        progress = min((frame - sampled) / interval, 1.0)
+        return interpolate_rgbcct(last, previous, progress, use_sign=False)
+
+    func.rate = rate
+    return func
+
+
+def _subsample_layout(
+    geometry: LEDGeometry, step: int
+) -> Dict[int, Tuple[int, int, float]]:
+    """
+    Maps every LED index to the positions (in geometry order) of the samples
+    before and after it on its strip, and its weight towards the later one.
+    Every step-th LED of a strip and its last LED are samples.
+    """
+
+    lengths = np.bincount(geometry.strip)
+    starts = np.cumsum(lengths) - lengths
+    start = starts[geometry.strip]
+    last = lengths[geometry.strip] - 1
+
+    i = np.arange(len(geometry)) - start
+    lo = i - i % step
+    hi = np.minimum(lo + step, last)
+    weight = np.where(hi > lo, (i - lo) / np.maximum(hi - lo, 1), 0.0)
+
+    return {
+        index: (a, b, w)
+        for index, a, b, w in zip(
+            geometry.index.tolist(),
+            (start + lo).tolist(),
+            (start + hi).tolist(),
+            weight.tolist(),
+        )
+    }
+
+
+def subsample(animation: Animation | RGBCCT, step: int = 2) -> Animation:
+    """
+    Evaluates the animation only at every step-th LED of each strip and at the
+    strip ends, the LEDs in between are interpolated linearly in RGB. Meant for
+    animations that change smoothly along the strips (e.g. wave), step = 1
+    evaluates every LED. Hue based animations (plasma, rainbow) show visible
+    errors where the hue wraps around or changes faster than the step.
+    """
+
+    if isinstance(animation, RGBCCT) or step <= 1:
+        return animation
+
+    layout: Dict[int, Tuple[int, int, float]] = dict()
+    layout_of: Optional[LEDGeometry] = None
+    samples: Dict[int, RGBCCT] = dict()
+    last_time: Optional[float] = None
+
+    def func(
+        time: float,
+        ctx: SceneContext,
+        led: LED,
+        objects: Iterable[Point],
+        *args,
+        **kwargs,
+    ) -> RGBCCT:
+        nonlocal layout, layout_of, last_time
+
+        geometry = ctx.geometry
+
+        # --- This logic should only run once per frame ---
+        if geometry is not layout_of:
+            layout = _subsample_layout(geometry, step)
+            layout_of = geometry
+            samples.clear()
+
+        if time != last_time:
+            samples.clear()
+            last_time = time
+        # --- End of per-frame logic ---
+
+        entry = layout.get(led.index)
+        if entry is None:
+            return animation(time, ctx, led, objects, *args, **kwargs)
+
+        def sample(position: int) -> RGBCCT:
+            color = samples.get(position)
+            if color is None:
+                sample_led = geometry.leds[position]
+                color = animation(time, ctx, sample_led, objects, *args, **kwargs)
+                samples[position] = color
+            return color
+
+        lo, hi, weight = entry
+        if weight == 0.0:
+            return sample(lo)
+
+        return interpolate_rgbcct(sample(lo), sample(hi), 1.0 - weight, use_sign=False)
+
+    func.rate = _rate_of(animation)
+    return func
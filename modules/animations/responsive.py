@@ -113,7 +113,7 @@ def paint(
         if time > last_frame_time:
             cutoff = time - persistence
             # 1. Prune history (x, y, t)
-            history = [h for h in history if h[2] > cutoff]
+            history[:] = [h for h in history if h[2] > cutoff]
 
             # 2. Sample new points if interval elapsed
             if time - last_sample_time >= sample_rate:
@@ -151,6 +151,8 @@ def paint(
 
         return primary_rgbcct if hit else secondary_rgbcct
 
+    # Handed to the rebuilt node when the config is reloaded
+    animation.state = history
     return animation
 
 
@@ -6,10 +6,16 @@ to serve as a single source of truth for the animation structures, which the
 frontend can then use to dynamically build its UI.
 """
 
+import gzip
+import hashlib
 import inspect
-from typing import Any, Dict, ForwardRef, List, get_args, get_origin
+import json
+from functools import lru_cache
+from typing import Any, Dict, ForwardRef, List, Tuple, get_args, get_origin
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
 from pydantic import BaseModel
 from pydantic_core import PydanticUndefined
 
@@ -169,10 +175,60 @@ def _parse_animation_union(union_model: Any) -> List[Dict[str, Any]]:
     return animations
 
 
-@router.get("/")
-def get_animations() -> List[Dict[str, Any]]:
+def _accepts_gzip(accept_encoding: str) -> bool:
+    """
+    Whether an Accept-Encoding header allows gzip, honouring q-values
+    """
+
+    qualities = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding.strip().lower()] = quality
+
+    return qualities.get("gzip", qualities.get("*", 0.0)) > 0
+
+
+@lru_cache(maxsize=None)
+def _get_animations_payload() -> Tuple[bytes, bytes, str]:
+    """
+    The animation list only depends on code, so it is introspected, serialized
+    and compressed once. Returns (JSON, gzipped JSON, ETag).
+    """
+    content = json.dumps(
+        jsonable_encoder(_parse_animation_union(AnimationModel)), separators=(",", ":")
+    ).encode()
+    etag = f'"{hashlib.sha256(content).hexdigest()[:16]}"'
+    return content, gzip.compress(content, compresslevel=9), etag
+
+
+@router.get("/", response_class=Response)
+def get_animations(request: Request):
     """
     Returns a list of all available idle and object animations, introspected
     from the API's own Pydantic models.
     """
-    return _parse_animation_union(AnimationModel)
+    content, compressed, etag = _get_animations_payload()
+    # Clients revalidate every time, which is a cheap 304 until the code changes
+    headers = {"Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+
+    if _accepts_gzip(request.headers.get("accept-encoding", "")):
+        # Every representation needs its own strong validator
+        etag = f'{etag[:-1]}-gz"'
+        headers["Content-Encoding"] = "gzip"
+        content = compressed
+    headers["ETag"] = etag
+
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in (tag.strip() for tag in if_none_match.split(",")):
+        headers.pop("Content-Encoding", None)
+        return Response(status_code=304, headers=headers)
+
+    return Response(content=content, media_type="application/json", headers=headers)
@@ -1,11 +1,15 @@
-from typing import List
+import hashlib
+import os
+from pathlib import Path
+from threading import Lock
+from typing import Any, Dict, List, Optional, Tuple
 
 import yaml
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from pydantic import BaseModel, Field
 
-from ..config import CONFIG
-from ..state import STATE
+from .. import config
+from ..cost import COST_MODEL
 from .models import AnimationModel
 
 router = APIRouter()
@@ -33,58 +37,172 @@ class StripModel(BaseModel):
     end: List[float]
 
 
+class SensorModel(BaseModel):
+    name: str
+    src_points: List[List[float]]
+    dst_points: List[List[float]]
+    # Area of the sensor image to take people from, the whole image if empty
+    cutout: List[List[float]] = []
+
+
+class XovisModel(BaseModel):
+    prediction: bool = True
+    prediction_horizon: float = Field(default=0.5, ge=0)
+    tracker_alpha: float = Field(default=0.85, ge=0, le=1)
+    tracker_beta: float = Field(default=0.3, ge=0, le=2)
+    track_ttl: float = Field(default=5.0, ge=0)
+    fusion_radius: float = Field(default=30.0, ge=0)
+    sensors: List[SensorModel] = []
+
+
 class ConfigModel(BaseModel):
     projection: ProjectionModel
     leds: LedsModel
     strips: List[StripModel]
+    xovis: XovisModel = XovisModel()
     animation: AnimationModel
 
 
+# --- Validated config cache ---
+
+
+class _ConfigCache:
+    """
+    Validated config.yaml, reparsed only when the file's mtime or size changed
+    """
+
+    _key: Optional[Tuple[int, int]] = None
+    _model: Optional[ConfigModel] = None
+    _etag: str = ""
+
+    def __init__(self) -> None:
+        self._lock = Lock()
+
+    def get(self) -> Tuple[ConfigModel, str]:
+        """
+        Returns (config, ETag). The config is shared, copy it before modifying.
+        """
+
+        with self._lock:
+            stat = os.stat(config.CONFIG.path)
+            key = (stat.st_mtime_ns, stat.st_size)
+            if key != self._key:
+                with open(config.CONFIG.path, "rb") as f:
+                    content = f.read()
+                self._set(
+                    key, ConfigModel(**yaml.load(content, config.YAML_LOADER)), content
+                )
+
+            return self._model, self._etag
+
+    def write(self, model: ConfigModel) -> bytes:
+        """
+        Saves a config to disk and keeps it as the cached version. Returns the
+        written content.
+        """
+
+        content = yaml.dump(
+            model.model_dump(), Dumper=config.YAML_DUMPER, sort_keys=False
+        ).encode()
+
+        with self._lock:
+            # Written aside and renamed, so the config watcher never reads a
+            # partial file
+            path = Path(config.CONFIG.path)
+            tmp = path.with_name(f".{path.name}.tmp")
+            with open(tmp, "wb") as f:
+                f.write(content)
+            os.replace(tmp, path)
+
+            stat = os.stat(path)
+            self._set((stat.st_mtime_ns, stat.st_size), model, content)
+
+        return content
+
+    def _set(self, key: Tuple[int, int], model: ConfigModel, content: bytes) -> None:
+        self._key = key
+        self._model = model
+        self._etag = f'"{hashlib.sha256(content).hexdigest()[:16]}"'
+
+
+_config_cache = _ConfigCache()
+
+
 # --- Endpoints ---
 
 
 @router.get("/", response_model=ConfigModel)
-def get_config():
+def get_config(request: Request, response: Response):
     """
     Returns the current configuration loaded from the YAML file.
     """
     try:
-        with open(CONFIG.path, "r") as f:
-            raw_config = yaml.safe_load(f)
-        return ConfigModel(**raw_config)
+        current, etag = _config_cache.get()
     except Exception as e:
         # Catches file errors and Pydantic validation errors
         raise HTTPException(
             status_code=500, detail=f"Failed to load or validate config: {e}"
         )
 
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+    return current
+
+
+def _estimate(new_config: ConfigModel) -> Dict[str, Any]:
+    return COST_MODEL.estimate(
+        new_config.model_dump()["animation"], len(config.CONFIG.GEOMETRY)
+    )
+
+
+@router.post("/estimate")
+def estimate_config(new_config: ConfigModel):
+    """
+    Estimates the frame time of a configuration for the installed LEDs.
+    """
+    return _estimate(new_config)
+
 
 @router.put("/")
-def update_config(new_config: ConfigModel):
+def update_config(
+    new_config: ConfigModel,
+    force: bool = Query(
+        default=False, description="Apply even if the frame budget is exceeded"
+    ),
+):
     """
     Updates the configuration, saves it to disk, and reloads the system.
+    Configurations estimated far below the target frame rate are rejected
+    unless forced.
     """
+    estimate = _estimate(new_config)
+    if estimate["status"] == "reject" and not force:
+        raise HTTPException(
+            status_code=422,
+            detail={
+                "message": f"Estimated {estimate['fps']} fps is below the minimum of "
+                f"{estimate['min_fps']} fps",
+                "estimate": estimate,
+            },
+        )
+
     try:
-        with open(CONFIG.path, "r") as f:
-            raw_config = yaml.safe_load(f)
-        old_config = ConfigModel(**raw_config)
+        current, _ = _config_cache.get()
+        old_config = current.model_copy(deep=True)
 
         # Apply only animation changes for security reasons
         old_config.animation = new_config.animation
 
-        config_dict = old_config.model_dump()
-
         # Save to file
-        with open(CONFIG.path, "w") as f:
-            yaml.dump(config_dict, f, sort_keys=False)
-
-        # Reload global config object
-        CONFIG.load()
+        content = _config_cache.write(old_config)
 
-        # Reload LED Controller if active
-        if STATE.led_controller:
-            STATE.led_controller.reload_config()
+        # Compile in the background, the LED controller switches to the new
+        # scene at its next frame
+        config.CONFIG.reload(content).result()
 
-        return {"message": "Config updated successfully"}
+        return {"message": "Config updated successfully", "estimate": estimate}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to update config: {e}")
@@ -1,9 +1,25 @@
-from fastapi import APIRouter
+import asyncio
+import json
+import struct
+import time
 
+import numpy as np
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+
+from ..latency import LATENCY
 from ..state import STATE
 
 router = APIRouter()
 
+# Binary frame messages of /data/ws: <type: u8> <frame number: u32> <payload>
+# Key frames carry the full frame, 5 bytes per LED in layout order. Delta frames
+# carry <skip: u32> <len: u32> <bytes> records against the previous frame.
+FRAME_KEY = 0
+FRAME_DELTA = 1
+FRAME_HEADER = struct.Struct("<BI")
+DELTA_RECORD = struct.Struct("<II")
+KEY_FRAME_INTERVAL = 5.0  # Seconds
+
 
 @router.get("/objects")
 def get_objects():
@@ -18,9 +34,12 @@ def get_leds():
     if not STATE.led_controller:
         return {}
 
+    # Scene and colors of one frame, so every LED has a color
+    scene, colors = STATE.led_controller.frame
+
     leds_data = {}
-    for led in STATE.led_controller.leds:
-        color = STATE.led_controller.color_of(led)
+    for led in scene.leds:
+        color = STATE.led_controller.color_of(led, colors)
         leds_data[led.index] = {
             "r": color.r,
             "g": color.g,
@@ -47,3 +66,150 @@ def get_fps():
         "tpf_avg": round(STATE.led_controller.tpf_avg * 1000, 2),  # ms
         "ups": round(ups, 2),
     }
+
+
+@router.get("/xovis")
+def get_xovis():
+    if not STATE.xovis_server:
+        return {"ups": 0, "tracks": {}, "subscribers": []}
+
+    return {
+        "ups": STATE.xovis_server.ups,
+        "tracks": STATE.xovis_server.track_stats,
+        "subscribers": STATE.xovis_server.subscriber_stats,
+    }
+
+
+@router.get("/latency")
+def get_latency():
+    """
+    Latency percentiles in ms per pipeline stage: projection (receive -> projected),
+    pickup (projected -> read by the controller), render, show and total.
+    sensor_offset is receive time minus the XOVIS timestamp.
+    """
+
+    return LATENCY.summary()
+
+
+def _pack_frame(leds, colors) -> bytes:
+    """
+    5 bytes per LED in channel order r, g, b, ww, cw (the little endian RGBCCT value)
+    """
+
+    return b"".join(
+        (colors[led.index] & 0xFFFFFFFFFF).to_bytes(5, "little") for led in leds
+    )
+
+
+def _encode_delta(previous: bytes, current: bytes) -> bytes:
+    """
+    Run-length encodes the changed byte ranges of current against previous.
+    Ranges closer than a record header are merged.
+    """
+
+    changed = np.frombuffer(previous, np.uint8) != np.frombuffer(current, np.uint8)
+    if not changed.any():
+        return b""
+
+    edges = np.diff(np.concatenate(([0], changed.view(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+
+    keep = np.concatenate(([True], starts[1:] - ends[:-1] > DELTA_RECORD.size))
+    starts = starts[keep]
+    ends = np.concatenate((ends[:-1][keep[1:]], ends[-1:]))
+
+    records = []
+    position = 0
+    for start, end in zip(starts.tolist(), ends.tolist()):
+        records.append(DELTA_RECORD.pack(start - position, end - start))
+        records.append(current[start:end])
+        position = end
+
+    return b"".join(records)
+
+
+def _clamp_fps(value) -> float:
+    return min(max(float(value), 1.0), 60.0)
+
+
+@router.websocket("/ws")
+async def stream(websocket: WebSocket):
+    """
+    Pushes rendered frames as binary messages (see FRAME_KEY / FRAME_DELTA) and
+    objects plus stats as JSON text messages. The first message is a JSON layout
+    with the LED indices in frame order. The rate is chosen with ?fps=n and can
+    be changed any time by sending {"fps": n}.
+    """
+
+    await websocket.accept()
+
+    rate = {"fps": _clamp_fps(websocket.query_params.get("fps", 20))}
+
+    async def read_rate():
+        while True:
+            try:
+                message = json.loads(await websocket.receive_text())
+                rate["fps"] = _clamp_fps(message.get("fps", rate["fps"]))
+            except (ValueError, AttributeError):
+                continue
+
+    reader = asyncio.create_task(read_rate())
+    leds = None
+    last_frame = None
+    last_frame_number = -1
+    last_key_frame = 0.0
+
+    try:
+        while not reader.done():
+            controller = STATE.led_controller
+
+            if controller is not None:
+                scene, colors = controller.frame
+                if leds is not scene.leds:
+                    leds = scene.leds
+                    last_frame = None
+                    await websocket.send_text(
+                        json.dumps(
+                            {
+                                "type": "layout",
+                                "leds": [led.index for led in leds],
+                                "channels": ["r", "g", "b", "ww", "cw"],
+                            }
+                        )
+                    )
+
+                frame_number = controller.frame_number
+                if frame_number != last_frame_number:
+                    frame = _pack_frame(leds, colors)
+                    now = time.monotonic()
+
+                    if (
+                        last_frame is None
+                        or len(last_frame) != len(frame)
+                        or now - last_key_frame > KEY_FRAME_INTERVAL
+                    ):
+                        message_type, payload = FRAME_KEY, frame
+                        last_key_frame = now
+                    else:
+                        message_type = FRAME_DELTA
+                        payload = _encode_delta(last_frame, frame)
+                        if len(payload) >= len(frame):
+                            message_type, payload = FRAME_KEY, frame
+
+                    await websocket.send_bytes(
+                        FRAME_HEADER.pack(message_type, frame_number & 0xFFFFFFFF)
+                        + payload
+                    )
+                    last_frame = frame
+                    last_frame_number = frame_number
+
+                await websocket.send_text(
+                    json.dumps({"type": "stats", "objects": get_objects(), **get_fps()})
+                )
+
+            await asyncio.sleep(1.0 / rate["fps"])
+    except WebSocketDisconnect:
+        pass
+    finally:
+        reader.cancel()
@@ -241,6 +241,25 @@ class PersistParams(BaseModel):
     duration: float = Field(default=2.0, ge=0.0)
 
 
+class HoldParams(BaseModel):
+    """Parameters for the hold animation."""
+
+    animation: Union["AnimationModel", RGBCCTModel] = Field(
+        default=RGBCCTModel(r=255, g=0, b=0, cw=0, ww=0)
+    )
+    frames: int = Field(default=0, ge=0)
+    interpolate: bool = False
+
+
+class SubsampleParams(BaseModel):
+    """Parameters for the subsample animation."""
+
+    animation: Union["AnimationModel", RGBCCTModel] = Field(
+        default=RGBCCTModel(r=255, g=0, b=0, cw=0, ww=0)
+    )
+    step: int = Field(default=2, ge=1)
+
+
 # --- Animation Wrapper Models (to enforce {'name': params} structure) ---
 
 
@@ -523,6 +542,32 @@ class PersistAnimation(BaseModel):
         extra = "forbid"  # Disallow other keys
 
 
+class HoldAnimation(BaseModel):
+    """Wrapper for the hold animation."""
+
+    hold: HoldParams = Field(
+        ...,
+        title="Hold",
+        description="Re-evaluates a slow sub-animation only every few frames.",
+    )
+
+    class Config:
+        extra = "forbid"  # Disallow other keys
+
+
+class SubsampleAnimation(BaseModel):
+    """Wrapper for the subsample animation."""
+
+    subsample: SubsampleParams = Field(
+        ...,
+        title="Subsample",
+        description="Evaluates a smooth sub-animation at every few LEDs and interpolates in between.",
+    )
+
+    class Config:
+        extra = "forbid"  # Disallow other keys
+
+
 # --- Union of All Animation Models ---
 AnimationModel = Union[
     AlternateAnimation,
@@ -548,6 +593,8 @@ AnimationModel = Union[
     ProximityAnimation,
     ProximitySpeedAnimation,
     PersistAnimation,
+    HoldAnimation,
+    SubsampleAnimation,
 ]
 
 # --- Rebuild Models to Resolve Forward References ---
@@ -574,3 +621,5 @@ ProximityParams.model_rebuild()
 ProximitySpeedParams.model_rebuild()
 SparkleParams.model_rebuild()
 PersistParams.model_rebuild()
+HoldParams.model_rebuild()
+SubsampleParams.model_rebuild()
@@ -1,16 +1,28 @@
-import cv2
+import asyncio
+from threading import Lock
+from typing import Any, Callable, Dict, List, Literal, Optional, Tuple
+
 import numpy as np
-import requests
-from fastapi import APIRouter
-from fastapi.responses import Response
+from fastapi import APIRouter, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response, StreamingResponse
 
 from .. import config
+from ..camera import CAMERA
 from ..helpers import to_hex
 from ..state import STATE
+from ..types import LED, Scene
 from ..xovis.homographic_projection import get_homography
 
+# cv2 is imported by the functions using it, it is slow to import and only the
+# camera views need it
+
 router = APIRouter()
 
+JPEG_QUALITY = 95  # OpenCV default
+# Requested widths are rounded up to a multiple of this, so clients share images
+WIDTH_STEP = 160
+
 
 @router.get("/objects", response_class=Response)
 def get_objects():
@@ -39,31 +51,41 @@ def get_strips():
     return Response(content=content, media_type="image/svg+xml")
 
 
-@router.get("/state", response_class=Response)
-def get_state():
-    if not STATE.led_controller:
-        return Response(status_code=503, content="LED Controller not ready")
+# Static part of the /state SVG, rebuilt when the config or LED list changes
+_state_skeleton: Dict[str, Any] = {"key": None, "parts": [], "leds": []}
+
+
+def _get_state_skeleton(scene: Scene) -> Tuple[List[str], List[LED]]:
+    """
+    Returns the SVG split at every gradient stop color, and the LEDs of scene
+    whose colors go in between.
+    """
+
+    leds = scene.leds
+    key = (config.CONFIG.version, id(leds))
+    if _state_skeleton["key"] == key:
+        return _state_skeleton["parts"], _state_skeleton["leds"]
+
+    leds_by_index = {led.index: led for led in leds}
+    floor = scene.floor
 
-    defs = []
+    parts = []
+    part = f'<svg width="{floor.p2.x}" height="{floor.p2.y}" xmlns="http://www.w3.org/2000/svg"><defs>'
+    stop_leds = []
     svg_elements = []
 
     for i, strip in enumerate(config.CONFIG.STRIPS):
         gradient_id = f"gradient{i}"
-        stops = []
+        part += f'<linearGradient id="{gradient_id}" x1="{strip.start.x}" y1="{strip.start.y}" x2="{strip.end.x}" y2="{strip.end.y}" gradientUnits="userSpaceOnUse">'
         for j in range(strip.len):
-            led_index = strip.index + j
-            led = next(
-                (led for led in STATE.led_controller.leds if led.index == led_index),
-                None,
-            )
+            led = leds_by_index.get(strip.index + j)
             if led:
-                color = STATE.led_controller.color_of(led)
-                hex_color = to_hex(color)
-                offset = j / (strip.len - 1)
-                stops.append(f'<stop offset="{offset}" stop-color="{hex_color}" />')
-        defs.append(
-            f'<linearGradient id="{gradient_id}" x1="{strip.start.x}" y1="{strip.start.y}" x2="{strip.end.x}" y2="{strip.end.y}" gradientUnits="userSpaceOnUse">{"".join(stops)}</linearGradient>'
-        )
+                offset = j / max(strip.len - 1, 1)
+                parts.append(part + f'<stop offset="{offset}" stop-color="')
+                part = '" />'
+                stop_leds.append(led)
+        part += "</linearGradient>"
+
         svg_elements.append(
             f'<line x1="{strip.start.x}" y1="{strip.start.y}" x2="{strip.end.x}" y2="{strip.end.y}" stroke="black" stroke-width="7" />'
         )
@@ -71,134 +93,325 @@ def get_state():
             f'<line x1="{strip.start.x}" y1="{strip.start.y}" x2="{strip.end.x}" y2="{strip.end.y}" stroke="url(#{gradient_id})" stroke-width="5" />'
         )
 
-    content = f'<svg width="{STATE.led_controller.floor.p2.x}" height="{STATE.led_controller.floor.p2.y}" xmlns="http://www.w3.org/2000/svg"><defs>{"".join(defs)}</defs><rect width="100%" height="100%" fill="transparent" stroke="black"/>{"".join(svg_elements)}</svg>'
-    return Response(content=content, media_type="image/svg+xml")
+    part += f'</defs><rect width="100%" height="100%" fill="transparent" stroke="black"/>{"".join(svg_elements)}</svg>'
+    parts.append(part)
 
+    _state_skeleton.update(key=key, parts=parts, leds=stop_leds)
+    return parts, stop_leds
 
-@router.get("/live", response_class=Response)
-def get_live():
+
+@router.get("/state", response_class=Response)
+def get_state(request: Request):
     if not STATE.led_controller:
         return Response(status_code=503, content="LED Controller not ready")
 
-    try:
-        response = requests.get("http://localhost:80/live", verify=False)
-        response.raise_for_status()
+    etag = f'"{config.CONFIG.version}-{STATE.led_controller.frame_number}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
 
-        image_array = np.frombuffer(response.content, np.uint8)
-        img = cv2.imdecode(image_array, cv2.IMREAD_COLOR)
+    # One consistent frame, scene and colors are swapped together per frame
+    scene, colors = STATE.led_controller.frame
+    parts, stop_leds = _get_state_skeleton(scene)
 
-        if img is None:
-            return Response(status_code=502, content="Failed to decode upstream image")
+    content = [""] * (2 * len(parts) - 1)
+    content[0::2] = parts
+    content[1::2] = [to_hex(colors[led.index]) for led in stop_leds]
 
-        img = cv2.flip(img, -1)
+    return Response(
+        content="".join(content), media_type="image/svg+xml", headers=headers
+    )
 
-        # Paint cutout on as polygon
-        cv2.polylines(
-            img, [np.array(config.CONFIG.CUTOUT, np.int32)], True, (0, 255, 0), 1
-        )
 
-        # Superimpose projected floor and strips
-        try:
-            # Calculate inverse homography (Floor -> Camera)
-            M = get_homography(src=config.CONFIG.CUTOUT)
-            M_inv = np.linalg.inv(M)
-
-            floor_height = STATE.led_controller.floor.p2.y
-
-            # Draw Floor (Blue)
-            floor = STATE.led_controller.floor
-            floor_pts = np.array(
-                [
-                    [floor.p1.x, floor.p1.y],
-                    [floor.p2.x, floor.p1.y],
-                    [floor.p2.x, floor.p2.y],
-                    [floor.p1.x, floor.p2.y],
-                ],
-                dtype=np.float32,
-            )
-            # transform expects shape (1, N, 2)
-            floor_pts_cam = cv2.perspectiveTransform(np.array([floor_pts]), M_inv)[0]
-            cv2.polylines(img, [np.int32(floor_pts_cam)], True, (255, 0, 0), 1)
-
-            # Draw LEDs with current colors
-            led_points_floor = np.array(
-                [
-                    [led.p.x, floor_height - led.p.y]
-                    for led in STATE.led_controller.leds
-                ],
-                dtype=np.float32,
-            )
-            if len(led_points_floor) > 0:
-                led_points_cam = cv2.perspectiveTransform(
-                    np.array([led_points_floor]), M_inv
-                )[0]
-
-                for i, led in enumerate(STATE.led_controller.leds):
-                    pt = tuple(np.int32(led_points_cam[i]))
-                    color = STATE.led_controller.color_of(led)
-                    # OpenCV uses BGR
-                    r = min(255, color.r + color.cw + color.ww)
-                    g = min(255, color.g + color.cw + color.ww)
-                    b = min(255, color.b + color.cw + color.ww)
-
-                    cv2.circle(img, pt, 2, (b, g, r), cv2.FILLED, cv2.LINE_AA)
-
-            # Draw Objects
-            object_points_floor = np.array(
-                [[p.x, floor_height - p.y] for p in STATE.objects], dtype=np.float32
-            )
-            if len(object_points_floor) > 0:
-                obj_points_cam = cv2.perspectiveTransform(
-                    np.array([object_points_floor]), M_inv
-                )[0]
-                for pt_arr in obj_points_cam:
-                    pt = tuple(np.int32(pt_arr))
-                    cv2.circle(img, pt, 5, (0, 0, 255), 2)
+# Encoded image per (view, width, quality) and the camera frame it was rendered
+# from. Rendering happens once per camera frame and is shared by all viewers,
+# images of older frames are dropped.
+_rendered: Dict[Tuple[str, Optional[int], int], Tuple[int, bytes]] = {}
+_render_lock = Lock()
 
-        except Exception as e:
-            print(f"Error projecting visualization overlays: {e}")
 
-        is_success, buffer = cv2.imencode(".jpg", img)
-        if not is_success:
-            return Response(status_code=500, content="Failed to encode image")
+def _render_shared(
+    view: str, width: Optional[int] = None, quality: int = JPEG_QUALITY
+) -> Tuple[int, Optional[bytes]]:
+    """
+    Returns (camera frame number, JPEG) of a view, None if there is no camera frame.
+    """
 
-        return Response(content=buffer.tobytes(), media_type="image/jpeg")
+    import cv2
 
-    except Exception as e:
-        print(f"Error in /live: {e}")
-        return Response(status_code=500, content=str(e))
+    frame_number, img = CAMERA.latest()
+    if img is None:
+        return frame_number, None
 
+    if width:
+        width = -(-width // WIDTH_STEP) * WIDTH_STEP
 
-@router.get("/live_mapped", response_class=Response)
-def get_live_mapped():
+    key = (view, width, quality)
+    with _render_lock:
+        cached = _rendered.get(key)
+        if cached is None or cached[0] != frame_number:
+            img = RENDERERS[view](img, width)
+
+            if width and width < img.shape[1]:
+                height = int(img.shape[0] * width / img.shape[1])
+                img = cv2.resize(img, (width, height), interpolation=cv2.INTER_AREA)
+
+            is_success, buffer = cv2.imencode(
+                ".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, quality]
+            )
+            if not is_success:
+                raise RuntimeError("Failed to encode image")
+
+            cached = (frame_number, buffer.tobytes())
+            for stale in [k for k, v in _rendered.items() if v[0] != frame_number]:
+                del _rendered[stale]
+            _rendered[key] = cached
+
+    return cached
+
+
+def _image_response(view: str) -> Response:
     if not STATE.led_controller:
         return Response(status_code=503, content="LED Controller not ready")
 
     try:
-        response = requests.get("http://localhost:80/live", verify=False)
-        response.raise_for_status()
+        _, content = _render_shared(view)
+        if content is None:
+            return Response(status_code=502, content="No camera frame available")
 
-        image_array = np.frombuffer(response.content, np.uint8)
-        img = cv2.imdecode(image_array, cv2.IMREAD_COLOR)
+        return Response(content=content, media_type="image/jpeg")
 
-        if img is None:
-            return Response(status_code=502, content="Failed to decode upstream image")
+    except Exception as e:
+        print(f"Error in /{view}: {e}")
+        return Response(status_code=500, content=str(e))
 
-        M = get_homography(src=config.CONFIG.CUTOUT)
 
-        width = int(STATE.led_controller.floor.p2.x)
-        height = int(STATE.led_controller.floor.p2.y)
+# Pixel offsets of a filled LED dot with radius 2
+_DOT_Y, _DOT_X = np.nonzero(np.hypot(*np.mgrid[-2:3, -2:3]) <= 2.0)
+_DOT_Y -= 2
+_DOT_X -= 2
+
+# Camera space overlay geometry, rebuilt when the config, LEDs or image size change
+_overlay_geometry: Dict[str, Any] = {"key": None}
+
+
+def _get_overlay_geometry(shape: Tuple[int, ...], scene: Scene) -> Dict[str, Any]:
+    import cv2
+
+    leds = scene.leds
+    key = (config.CONFIG.version, id(leds), shape[:2])
+    if _overlay_geometry["key"] == key:
+        return _overlay_geometry
+
+    height, width = shape[:2]
+    floor = scene.floor
+    floor_height = floor.p2.y
+
+    # Calculate inverse homography (Floor -> Camera)
+    M_inv = np.linalg.inv(get_homography(src=config.CONFIG.CUTOUT))
+
+    floor_pts = np.array(
+        [
+            [floor.p1.x, floor.p1.y],
+            [floor.p2.x, floor.p1.y],
+            [floor.p2.x, floor.p2.y],
+            [floor.p1.x, floor.p2.y],
+        ],
+        dtype=np.float32,
+    )
+    # transform expects shape (1, N, 2)
+    floor_pts_cam = cv2.perspectiveTransform(np.array([floor_pts]), M_inv)[0]
+
+    # Every pixel of every LED dot: image coordinates and the LED it belongs to
+    dot_ys = np.empty(0, np.intp)
+    dot_xs = np.empty(0, np.intp)
+    dot_leds = np.empty(0, np.intp)
+    led_geometry = scene.geometry
+    if len(led_geometry) > 0:
+        led_points_floor = np.stack(
+            [led_geometry.x, floor_height - led_geometry.y], axis=1
+        ).astype(np.float32)
+        led_points_cam = np.int32(
+            cv2.perspectiveTransform(np.array([led_points_floor]), M_inv)[0]
+        )
+        ys = (led_points_cam[:, 1, np.newaxis] + _DOT_Y).ravel()
+        xs = (led_points_cam[:, 0, np.newaxis] + _DOT_X).ravel()
+        inside = (ys >= 0) & (ys < height) & (xs >= 0) & (xs < width)
+        dot_ys = ys[inside]
+        dot_xs = xs[inside]
+        dot_leds = np.repeat(np.arange(len(led_geometry)), len(_DOT_Y))[inside]
+
+    _overlay_geometry.update(
+        key=key,
+        M_inv=M_inv,
+        cutout=np.array(config.CONFIG.CUTOUT, np.int32),
+        floor=np.int32(floor_pts_cam),
+        floor_height=floor_height,
+        dot_ys=dot_ys,
+        dot_xs=dot_xs,
+        dot_leds=dot_leds,
+    )
+    return _overlay_geometry
+
+
+def _led_colors_bgr(leds, colors) -> np.ndarray:
+    """
+    BGR color per LED with both whites added on top, as uint8 (N, 3)
+    """
+
+    values = np.fromiter(
+        (colors[led.index] for led in leds), dtype=np.int64, count=len(leds)
+    )
+    white = ((values >> 24) & 0xFF) + ((values >> 32) & 0xFF)
+    bgr = np.stack(((values >> 16) & 0xFF, (values >> 8) & 0xFF, values & 0xFF), axis=1)
+    return np.minimum(bgr + white[:, np.newaxis], 255).astype(np.uint8)
+
+
+def _render_live(img: np.ndarray, width: Optional[int] = None) -> np.ndarray:
+    import cv2
+
+    # The camera frame is shared, draw on a copy
+    img = img.copy()
 
-        img = cv2.flip(img, -1)
-        warped_img = cv2.warpPerspective(img, M, (width, height))
-        warped_img = cv2.flip(warped_img, 0)
+    try:
+        # Scene and colors of one frame, so the dots match the LEDs
+        scene, colors = STATE.led_controller.frame
+        geometry = _get_overlay_geometry(img.shape, scene)
 
-        is_success, buffer = cv2.imencode(".jpg", warped_img)
-        if not is_success:
-            return Response(status_code=500, content="Failed to encode image")
+        # Paint cutout on as polygon
+        cv2.polylines(img, [geometry["cutout"]], True, (0, 255, 0), 1)
 
-        return Response(content=buffer.tobytes(), media_type="image/jpeg")
+        # Draw Floor (Blue)
+        cv2.polylines(img, [geometry["floor"]], True, (255, 0, 0), 1)
+
+        # Draw LEDs with current colors, all dots at once
+        if len(scene.leds) > 0:
+            bgr = _led_colors_bgr(scene.leds, colors)
+            img[geometry["dot_ys"], geometry["dot_xs"]] = bgr[geometry["dot_leds"]]
+
+        # Draw Objects
+        floor_height = geometry["floor_height"]
+        object_points_floor = np.array(
+            [[p.x, floor_height - p.y] for p in STATE.objects], dtype=np.float32
+        )
+        if len(object_points_floor) > 0:
+            obj_points_cam = cv2.perspectiveTransform(
+                np.array([object_points_floor]), geometry["M_inv"]
+            )[0]
+            for pt_arr in obj_points_cam:
+                pt = tuple(int(v) for v in pt_arr)
+                cv2.circle(img, pt, 5, (0, 0, 255), 2)
 
     except Exception as e:
-        print(f"Error in /live: {e}")
-        return Response(status_code=500, content=str(e))
+        print(f"Error projecting visualization overlays: {e}")
+
+    return img
+
+
+# Bird's-eye remap tables, rebuilt when the config, image size or output size change
+_mapped_geometry: Dict[str, Any] = {"key": None}
+
+
+def _get_mapped_geometry(
+    shape: Tuple[int, ...], width: Optional[int]
+) -> Dict[str, Any]:
+    import cv2
+
+    floor_width = int(STATE.led_controller.floor.p2.x)
+    floor_height = int(STATE.led_controller.floor.p2.y)
+
+    # Render straight at the requested width instead of scaling down afterwards
+    out_width = min(width, floor_width) if width else floor_width
+    out_height = max(1, round(floor_height * out_width / floor_width))
+
+    key = (config.CONFIG.version, shape[:2], out_width, out_height)
+    if _mapped_geometry["key"] == key:
+        return _mapped_geometry
+
+    M_inv = np.linalg.inv(get_homography(src=config.CONFIG.CUTOUT))
+
+    # Floor coordinates of every output pixel center, flipped vertically
+    scale = out_width / floor_width
+    u, v = np.meshgrid(
+        np.arange(out_width, dtype=np.float64), np.arange(out_height, dtype=np.float64)
+    )
+    x = (u + 0.5) / scale - 0.5
+    y = (floor_height - 1) - ((v + 0.5) / scale - 0.5)
+
+    # Camera coordinates of them, the same lookup warpPerspective does per request
+    w = M_inv[2, 0] * x + M_inv[2, 1] * y + M_inv[2, 2]
+    map_x = ((M_inv[0, 0] * x + M_inv[0, 1] * y + M_inv[0, 2]) / w).astype(np.float32)
+    map_y = ((M_inv[1, 0] * x + M_inv[1, 1] * y + M_inv[1, 2]) / w).astype(np.float32)
+
+    map1, map2 = cv2.convertMaps(map_x, map_y, cv2.CV_16SC2)
+    _mapped_geometry.update(key=key, map1=map1, map2=map2)
+    return _mapped_geometry
+
+
+def _render_live_mapped(img: np.ndarray, width: Optional[int] = None) -> np.ndarray:
+    import cv2
+
+    geometry = _get_mapped_geometry(img.shape, width)
+    return cv2.remap(img, geometry["map1"], geometry["map2"], cv2.INTER_LINEAR)
+
+
+# Renderers get the camera frame and the requested output width, which they may
+# honor themselves; wider results are scaled down afterwards
+RENDERERS: Dict[str, Callable[[np.ndarray, Optional[int]], np.ndarray]] = {
+    "live": _render_live,
+    "live_mapped": _render_live_mapped,
+}
+
+
+@router.get("/live", response_class=Response)
+def get_live():
+    return _image_response("live")
+
+
+@router.get("/live_mapped", response_class=Response)
+def get_live_mapped():
+    return _image_response("live_mapped")
+
+
+@router.get("/stream")
+async def get_stream(
+    view: Literal["live", "live_mapped"] = "live_mapped",
+    width: Optional[int] = Query(default=None, gt=0),
+    quality: int = Query(default=JPEG_QUALITY, ge=10, le=100),
+    fps: float = Query(default=10.0, gt=0, le=30),
+):
+    """
+    MJPEG (multipart/x-mixed-replace) stream of a live view, usable as <img src>.
+    Every client always gets the newest frame, slow clients skip frames instead
+    of queueing them.
+    """
+
+    if not STATE.led_controller:
+        return Response(status_code=503, content="LED Controller not ready")
+
+    async def frames():
+        last_frame_number = None
+
+        while True:
+            try:
+                frame_number, content = await run_in_threadpool(
+                    _render_shared, view, width, quality
+                )
+            except Exception as e:
+                print(f"Error in /stream: {e}")
+                content = None
+
+            if content is not None and frame_number != last_frame_number:
+                last_frame_number = frame_number
+                yield (
+                    b"--frame\r\nContent-Type: image/jpeg\r\n"
+                    + f"Content-Length: {len(content)}\r\n\r\n".encode()
+                    + content
+                    + b"\r\n"
+                )
+
+            await asyncio.sleep(1.0 / fps)
+
+    return StreamingResponse(
+        frames(), media_type="multipart/x-mixed-replace; boundary=frame"
+    )
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Background grabber for the sensor's live camera image
+"""
+
+import time
+from threading import Condition, Thread
+from typing import Optional, Tuple
+
+import numpy as np
+
+from .xovis.dispatch import LatestValue
+
+CAMERA_URL = "http://localhost:80/live"
+CAMERA_MAX_FPS = 10.0
+CAMERA_IDLE_TIMEOUT = 10.0  # Seconds without viewers before grabbing pauses
+
+
+class CameraGrabber:
+    """
+    Fetches camera frames at a bounded rate over one pooled connection, decodes
+    them once and publishes the latest frame (already flipped, the sensor is
+    mounted upside down). Grabbing starts with the first viewer and pauses when
+    no one asked for a frame for a while.
+    """
+
+    url: str
+    max_fps: float
+    idle_timeout: float
+    frame: LatestValue[np.ndarray]
+
+    _thread: Optional[Thread] = None
+    _last_demand: float = 0.0
+
+    def __init__(
+        self,
+        url: str = CAMERA_URL,
+        max_fps: float = CAMERA_MAX_FPS,
+        idle_timeout: float = CAMERA_IDLE_TIMEOUT,
+    ) -> None:
+        self.url = url
+        self.max_fps = max_fps
+        self.idle_timeout = idle_timeout
+        self.frame = LatestValue()
+        self._session = None
+        self._condition = Condition()
+
+    def latest(self, timeout: float = 2.0) -> Tuple[int, Optional[np.ndarray]]:
+        """
+        Returns (frame number, frame). Waits up to timeout for the first frame.
+        The frame is shared, it must not be modified.
+        """
+
+        self._last_demand = time.monotonic()
+
+        with self._condition:
+            if self._thread is None or not self._thread.is_alive():
+                # Do not serve a frame from before the pause
+                self.frame.put(None)
+                self._thread = Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+            if self.frame.get() is None:
+                self._condition.wait_for(
+                    lambda: self.frame.get() is not None, timeout=timeout
+                )
+
+        return self.frame.poll()
+
+    def _grab(self) -> Optional[np.ndarray]:
+        # Imported on first use, both take long to import and are only needed here
+        import cv2
+        import requests
+
+        if self._session is None:
+            self._session = requests.Session()
+
+        response = self._session.get(self.url, verify=False, timeout=5)
+        response.raise_for_status()
+
+        img = cv2.imdecode(np.frombuffer(response.content, np.uint8), cv2.IMREAD_COLOR)
+        if img is None:
+            return None
+
+        return cv2.flip(img, -1)
+
+    def _run(self) -> None:
+        interval = 1.0 / self.max_fps
+
+        while time.monotonic() - self._last_demand < self.idle_timeout:
+            start = time.monotonic()
+
+            try:
+                img = self._grab()
+                if img is not None:
+                    with self._condition:
+                        self.frame.put(img)
+                        self._condition.notify_all()
+            except Exception as e:
+                print(f"Error grabbing camera frame: {e}")
+                time.sleep(1.0)
+
+            delay = interval - (time.monotonic() - start)
+            if delay > 0:
+                time.sleep(delay)
+
+
+# Global camera instance
+CAMERA = CameraGrabber()
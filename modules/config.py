@@ -3,17 +3,31 @@
 Definitions for LED positions
 """
 
+import functools
 import inspect
+import json
 import threading
+from concurrent.futures import Future
 from pathlib import Path
-from typing import Any, Dict, List, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
+import numpy as np
 import yaml
 from rpi_ws2805 import RGBCCT
 
 from .animations import idle, meta, responsive
-from .helpers import interpolate_points
-from .types import LED, Animation, Point, Rectangle, Strip
+from .scene_cache import content_key, load_compiled, store_compiled
+from .types import (
+    LED,
+    Animation,
+    LEDGeometry,
+    Point,
+    Rectangle,
+    Scene,
+    SceneContext,
+    Sensor,
+    Strip,
+)
 
 
 def _get_animation_functions():
@@ -32,6 +46,26 @@ def _get_animation_functions():
 
 ANIMATION_FUNCTIONS = _get_animation_functions()
 
+# Animations folded at parse time, see GANGWAYConfig._fold
+FOLD_WRAPPERS = {"smooth", "persist", "proximity_speed", "hold", "subsample"}
+FOLD_BRANCHES = {
+    "proximity": ("primary", "secondary"),
+    "schedule": ("primary", "secondary"),
+    "idle": ("idle_animation", "active_animation"),
+    "dot": ("primary", "secondary"),
+    "exponential": ("primary", "secondary"),
+}
+FOLD_PURE = {"blend"}
+
+# libyaml is much faster than the pure Python parser, if PyYAML was built with it
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+YAML_DUMPER = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+
+@functools.lru_cache(maxsize=None)
+def _signature(func: Callable) -> inspect.Signature:
+    return inspect.signature(func)
+
 
 class GANGWAYConfig:
     SRC_POINTS: List[Tuple[int, int]]
@@ -42,58 +76,190 @@ class GANGWAYConfig:
     STRIPS: List[Strip]
     OFFSET_X: int
     OFFSET_Y: int
-    LEDS: List[LED]
+    GEOMETRY: LEDGeometry
     ANIMATION: Animation | RGBCCT
+    PREDICTION: bool
+    PREDICTION_HORIZON: float
+    TRACKER_ALPHA: float
+    TRACKER_BETA: float
+    TRACK_TTL: float
+    SENSORS: List[Sensor]
+    FUSION_RADIUS: float
+
+    # Increased on every load, lets consumers cache data derived from the config
+    version: int = 0
+
+    SCENE: Scene
+
+    # Raw config and content hash of the last load
+    data: Optional[Dict[str, Any]] = None
+    key: Optional[str] = None
+
+    # Animation nodes of the last load by (tree path, canonical config), reused by
+    # the next load so unchanged subtrees keep their state
+    _nodes: Dict[Tuple[str, str], Animation] = {}
 
     def __init__(self, path: Path):
         self._lock = threading.Lock()
+        self._listeners: List[Callable[[Scene], None]] = []
+        self._reloader = _Reloader(self)
         self.path = path
         self.load()
 
-    def load(self):
-        with self._lock:
-            with open(self.path, "r") as f:
-                config = yaml.safe_load(f)
+    @property
+    def LEDS(self) -> List[LED]:
+        return self.GEOMETRY.leds
+
+    def add_listener(self, callback: Callable[[Scene], None]) -> None:
+        """
+        Calls back with the new scene after every load
+        """
+
+        self._listeners.append(callback)
+
+    def reload(self, content: Optional[bytes] = None) -> "Future[Scene]":
+        """
+        Loads the config file in a background thread. The future resolves to the
+        new scene once listeners have it, or to the error that stopped loading.
+        content is loaded instead of the file, e.g. after it was validated.
+        """
+
+        return self._reloader.request(content)
+
+    def load(self, content: Optional[bytes] = None) -> Scene:
+        """
+        Loads content, or the config file if None
+        """
+
+        if content is None:
+            with open(self.path, "rb") as f:
+                content = f.read()
+
+        # A config seen before is read from its compiled artefacts
+        key = content_key(content)
+        compiled = load_compiled(self.path, key)
+        if compiled is not None:
+            config, geometry = compiled
+        else:
+            config, geometry = yaml.load(content, YAML_LOADER), None
+
+        # Everything is built aside and swapped in at once, so readers never see
+        # a half loaded config and a broken file leaves the current one in place
+        values = self._compile(config, geometry)
+
+        if compiled is None:
+            store_compiled(
+                self.path,
+                key,
+                config,
+                values["GEOMETRY"].fields,
+            )
 
+        with self._lock:
             self.data = config
-            projection = config.get("projection", {})
-            self.SRC_POINTS = [tuple(p) for p in projection.get("src_points", [])]
-            self.DST_POINTS = [tuple(p) for p in projection.get("dst_points", [])]
-            self.CUTOUT = [tuple(p) for p in projection.get("cutout", [])]
-
-            floor_rect = tuple(projection.get("floor", (0, 0, 0, 0)))
-
-            self.FLOOR = Rectangle(
-                Point.from_tuple(floor_rect[:2]),
-                Point.from_tuple(floor_rect[2:]),
+            self.key = key
+            for name, value in values.items():
+                setattr(self, name, value)
+
+            self.version += 1
+            self.SCENE = Scene(
+                version=self.version,
+                floor=self.FLOOR,
+                geometry=self.GEOMETRY,
+                animation=self.ANIMATION,
+                context=SceneContext(self.FLOOR, self.GEOMETRY),
             )
-
-            leds_config = config.get("leds", {})
-            self.TARGET_WEIGHT = leds_config.get("target_weight", 0.1)
-            self.OFFSET_X = leds_config.get("offset_x", 0)
-            self.OFFSET_Y = leds_config.get("offset_y", 0)
-
-            self.STRIPS = [
+            scene = self.SCENE
+
+        for listener in self._listeners:
+            listener(scene)
+
+        return scene
+
+    def _compile(
+        self, config: Dict[str, Any], geometry: Optional[np.ndarray] = None
+    ) -> Dict[str, Any]:
+        """
+        Builds all config values. geometry holds cached LED geometry fields.
+        """
+
+        projection = config.get("projection", {})
+        src_points = [tuple(p) for p in projection.get("src_points", [])]
+        dst_points = [tuple(p) for p in projection.get("dst_points", [])]
+        cutout = [tuple(p) for p in projection.get("cutout", [])]
+
+        floor_rect = tuple(projection.get("floor", (0, 0, 0, 0)))
+
+        floor = Rectangle(
+            Point.from_tuple(floor_rect[:2]),
+            Point.from_tuple(floor_rect[2:]),
+        )
+
+        leds_config = config.get("leds", {})
+        offset_x = leds_config.get("offset_x", 0)
+        offset_y = leds_config.get("offset_y", 0)
+
+        previous = self.data or {}
+        previous_leds_config = previous.get("leds", {})
+        if (
+            self.data is not None
+            and config.get("strips", []) == previous.get("strips", [])
+            and offset_x == previous_leds_config.get("offset_x", 0)
+            and offset_y == previous_leds_config.get("offset_y", 0)
+        ):
+            # Same geometry, keep the LED objects so everything keyed on them stays
+            strips, led_geometry = self.STRIPS, self.GEOMETRY
+        else:
+            strips = [
                 Strip(
                     index=s.get("index"),
                     len=s.get("len"),
-                    start=Point(*s.get("start"))
-                    + Point(x=self.OFFSET_X, y=self.OFFSET_Y),
-                    end=Point(*s.get("end")) + Point(x=self.OFFSET_X, y=self.OFFSET_Y),
+                    start=Point(*s.get("start")) + Point(x=offset_x, y=offset_y),
+                    end=Point(*s.get("end")) + Point(x=offset_x, y=offset_y),
                 )
                 for s in config.get("strips", [])
             ]
-
-            self.LEDS = [
-                LED(
-                    i + strip.index,
-                    interpolate_points(strip.start, strip.end, strip.len, i),
+            if geometry is not None and geometry.shape[1] == sum(s.len for s in strips):
+                led_geometry = LEDGeometry.from_fields(geometry)
+            else:
+                led_geometry = LEDGeometry.from_strips(strips)
+
+        xovis_config = config.get("xovis", {})
+        nodes: Dict[Tuple[str, str], Animation] = {}
+
+        return {
+            "SRC_POINTS": src_points,
+            "DST_POINTS": dst_points,
+            "CUTOUT": cutout,
+            "FLOOR": floor,
+            "TARGET_WEIGHT": leds_config.get("target_weight", 0.1),
+            "OFFSET_X": offset_x,
+            "OFFSET_Y": offset_y,
+            "STRIPS": strips,
+            "GEOMETRY": led_geometry,
+            "PREDICTION": xovis_config.get("prediction", True),
+            "PREDICTION_HORIZON": xovis_config.get("prediction_horizon", 0.5),
+            "TRACKER_ALPHA": xovis_config.get("tracker_alpha", 0.85),
+            "TRACKER_BETA": xovis_config.get("tracker_beta", 0.3),
+            "TRACK_TTL": xovis_config.get("track_ttl", 5.0),
+            "FUSION_RADIUS": xovis_config.get("fusion_radius", 30.0),
+            # Without explicit sensors, the projection section describes the only one
+            "SENSORS": [
+                Sensor(
+                    name=str(s.get("name")),
+                    src_points=[tuple(p) for p in s.get("src_points", [])],
+                    dst_points=[tuple(p) for p in s.get("dst_points", [])],
+                    cutout=[tuple(p) for p in s.get("cutout", [])],
                 )
-                for strip in self.STRIPS
-                for i in range(strip.len)
+                for s in xovis_config.get("sensors", [])
             ]
-
-            self.ANIMATION = self._parse_animation(config.get("animation", {}))
+            # The projection's cutout frames the camera views, not detections
+            or [Sensor("default", src_points, dst_points, [])],
+            "ANIMATION": self._parse_animation(
+                config.get("animation", {}), "animation", nodes
+            ),
+            "_nodes": nodes,
+        }
 
     def save(self):
         with self._lock:
@@ -109,13 +275,36 @@ class GANGWAYConfig:
             with open(self.path, "w") as f:
                 yaml.dump(config, f)
 
-    def _parse_animation(self, anim_config: Any) -> Animation | RGBCCT:
+    def _parse_animation(
+        self,
+        anim_config: Any,
+        path: str = "animation",
+        nodes: Optional[Dict[Tuple[str, str], Animation]] = None,
+    ) -> Animation | RGBCCT:
+        """
+        Builds the animation at path in the tree. Nodes are collected in nodes,
+        a node with the same path and config as in the last load is reused
+        together with its state, rebuilt nodes take over what state they can
+        (see _carry_state).
+        """
+
+        if nodes is None:
+            nodes = {}
+
         if not isinstance(anim_config, dict):
             return anim_config
 
         if "r" in anim_config and "g" in anim_config and "b" in anim_config:
             return RGBCCT(**anim_config)
 
+        key = (path, json.dumps(anim_config, sort_keys=True, default=str))
+        if key in self._nodes:
+            # The whole subtree is unchanged, carry over its nodes as well
+            for node_key, node in self._nodes.items():
+                if node_key[0] == path or node_key[0].startswith(path + "."):
+                    nodes[node_key] = node
+            return self._nodes[key]
+
         anim_name = list(anim_config.keys())[0]
         anim_args = list(anim_config.values())[0]
 
@@ -123,7 +312,7 @@ class GANGWAYConfig:
         if not anim_func:
             raise ValueError(f"Unknown animation function: {anim_name}")
 
-        sig = inspect.signature(anim_func)
+        sig = _signature(anim_func)
 
         # Check for unexpected arguments
         valid_param_names = {p.name for p in sig.parameters.values()}
@@ -139,25 +328,173 @@ class GANGWAYConfig:
         for param in sig.parameters.values():
             if param.kind == inspect.Parameter.VAR_POSITIONAL:
                 if param.name in anim_args:
-                    for arg in anim_args[param.name]:
-                        var_args.append(self._parse_animation(arg))
+                    for i, arg in enumerate(anim_args[param.name]):
+                        var_args.append(
+                            self._parse_animation(
+                                arg, f"{path}.{param.name}[{i}]", nodes
+                            )
+                        )
                 continue
 
             if param.name in anim_args:
                 arg_value = anim_args[param.name]
                 if isinstance(arg_value, dict):
-                    parsed_args[param.name] = self._parse_animation(arg_value)
+                    parsed_args[param.name] = self._parse_animation(
+                        arg_value, f"{path}.{param.name}", nodes
+                    )
                 elif isinstance(arg_value, list):
                     parsed_args[param.name] = [
-                        self._parse_animation(v) for v in arg_value
+                        self._parse_animation(v, f"{path}.{param.name}[{i}]", nodes)
+                        for i, v in enumerate(arg_value)
                     ]
                 else:
                     parsed_args[param.name] = arg_value
             elif param.default is not inspect.Parameter.empty:
                 parsed_args[param.name] = param.default
 
-        return anim_func(*var_args, **parsed_args)
+        node = self._fold(anim_name, anim_func, anim_args, var_args, parsed_args)
+        self._carry_state(path, anim_name, node)
+        nodes[key] = node
+        return node
+
+    def _carry_state(self, path: str, anim_name: str, node: Animation | RGBCCT) -> None:
+        """
+        Copies the state of the last load's node at path into its rebuilt
+        version, so e.g. smooth keeps its moving average when something below it
+        is edited. Only animations that expose their state (smooth, persist,
+        paint) carry it over.
+        """
+
+        state = getattr(node, "state", None)
+        if state is None:
+            return
+
+        for (node_path, _), previous in self._nodes.items():
+            previous_state = getattr(previous, "state", None)
+            if (
+                node_path != path
+                or previous_state is None
+                or previous_state is state
+                or type(previous_state) is not type(state)
+                or getattr(previous, "__qualname__", "").split(".")[0] != anim_name
+            ):
+                continue
+
+            # Single C-level copies, safe while the render thread still uses it
+            if isinstance(state, dict):
+                state.update(previous_state)
+            else:
+                state[:] = previous_state
+            return
+
+    def _fold(
+        self,
+        anim_name: str,
+        anim_func: Callable,
+        anim_args: Dict[str, Any],
+        var_args: List[Animation | RGBCCT],
+        parsed_args: Dict[str, Any],
+    ) -> Animation | RGBCCT:
+        """
+        Builds an animation, replacing it by a constant or its only relevant child
+        where its output is known at parse time
+        """
+
+        if anim_name == "static" and isinstance(parsed_args["color"], RGBCCT):
+            return parsed_args["color"]
+
+        if anim_name == "off":
+            return RGBCCT()
+
+        if anim_name == "alternate" and len(var_args) <= 1:
+            return var_args[0] if var_args else RGBCCT()
+
+        # Wrappers that pass a constant through unchanged
+        if anim_name in FOLD_WRAPPERS and isinstance(parsed_args["animation"], RGBCCT):
+            return parsed_args["animation"]
+
+        # Choosing or blending between two identical branches gives that branch
+        if anim_name in FOLD_BRANCHES:
+            first, second = FOLD_BRANCHES[anim_name]
+            same_config = (
+                first in anim_args
+                and second in anim_args
+                and json.dumps(anim_args[first], sort_keys=True, default=str)
+                == json.dumps(anim_args[second], sort_keys=True, default=str)
+            )
+            if same_config or parsed_args[first] is parsed_args[second]:
+                return parsed_args[first]
+
+        node = anim_func(*var_args, **parsed_args)
+
+        # Pure functions of constant children are constant themselves
+        if anim_name in FOLD_PURE and all(isinstance(a, RGBCCT) for a in var_args):
+            return node(0.0, None, None, [])
+
+        return node
+
+
+class _Reloader(threading.Thread):
+    """
+    Loads the config off the calling and render threads. Requests that arrive
+    while a load is running are served together by the next one, which loads
+    the content of the latest request.
+    """
+
+    def __init__(self, config: GANGWAYConfig) -> None:
+        super().__init__(daemon=True)
+        self._config = config
+        self._pending: List[Future] = []
+        self._content: Optional[bytes] = None
+        self._condition = threading.Condition()
+
+    def request(self, content: Optional[bytes] = None) -> Future:
+        future = Future()
+
+        with self._condition:
+            if not self.is_alive():
+                self.start()
+            self._pending.append(future)
+            self._content = content
+            self._condition.notify()
+
+        return future
+
+    def run(self) -> None:
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: len(self._pending) > 0)
+                futures, self._pending = self._pending, []
+                content, self._content = self._content, None
+
+            try:
+                scene = self._config.load(content)
+            except Exception as e:
+                print(f"Error reloading config: {e}")
+                for future in futures:
+                    future.set_exception(e)
+                continue
+
+            for future in futures:
+                future.set_result(scene)
+
+
+# Path of the global config, may be changed before its first use
+CONFIG_PATH = Path(__file__).parent.parent / "config.yaml"
+
+_config: Optional[GANGWAYConfig] = None
+_config_lock = threading.Lock()
+
+
+def __getattr__(name: str) -> Any:
+    # The global config instance CONFIG is loaded on first use, not on import
+    global _config
+
+    if name != "CONFIG":
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
+    with _config_lock:
+        if _config is None:
+            _config = GANGWAYConfig(CONFIG_PATH)
 
-# Global config instance
-CONFIG = GANGWAYConfig(Path(__file__).parent.parent / "config.yaml")
+    return _config
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Reloads the config when config.yaml is changed outside the API
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+from threading import Thread
+from typing import Optional, Tuple
+
+import yaml
+
+from .config import YAML_LOADER, GANGWAYConfig
+from .scene_cache import content_key
+
+# From <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+INOTIFY_EVENT = struct.Struct("iIII")  # wd, mask, cookie, name length
+
+
+class ConfigWatcher(Thread):
+    """
+    Watches the config file with inotify, or by polling its mtime where inotify is
+    not available. Once writes have settled for `debounce` seconds the config is
+    reloaded in the background and applied like an API update. A file that fails
+    to load is reported and leaves the running scene untouched.
+    """
+
+    config: GANGWAYConfig
+    debounce: float
+    poll_interval: float
+    running: bool = True
+
+    _fd: Optional[int] = None
+    _stat: Optional[Tuple[int, int]] = None
+
+    def __init__(
+        self,
+        gangway_config: GANGWAYConfig,
+        debounce: float = 0.5,
+        poll_interval: float = 1.0,
+    ) -> None:
+        super().__init__(daemon=True)
+        self.config = gangway_config
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+
+    def stop(self) -> None:
+        self.running = False
+        self.join()
+
+    def _init_inotify(self) -> Optional[int]:
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+            fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if fd < 0:
+                raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+            # The directory is watched, editors and deploy scripts often replace
+            # the file instead of writing to it
+            directory = os.fsencode(os.path.dirname(os.path.abspath(self.config.path)))
+            if (
+                libc.inotify_add_watch(
+                    fd, directory, IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+                )
+                < 0
+            ):
+                os.close(fd)
+                raise OSError(ctypes.get_errno(), "inotify_add_watch failed")
+
+            return fd
+        except (OSError, AttributeError, TypeError) as e:
+            print(f"inotify not available, polling config file instead: {e}")
+            return None
+
+    def _wait_inotify(self, timeout: float) -> bool:
+        """
+        Returns whether the config file was touched within timeout
+        """
+
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return False
+
+        try:
+            buffer = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return False
+
+        name = os.fsencode(os.path.basename(self.config.path))
+        changed = False
+        offset = 0
+        while offset + INOTIFY_EVENT.size <= len(buffer):
+            _, _, _, length = INOTIFY_EVENT.unpack_from(buffer, offset)
+            offset += INOTIFY_EVENT.size
+            changed |= buffer[offset : offset + length].rstrip(b"\0") == name
+            offset += length
+
+        return changed
+
+    def _wait_poll(self, timeout: float) -> bool:
+        time.sleep(min(timeout, self.poll_interval))
+
+        try:
+            stat = os.stat(self.config.path)
+        except OSError:
+            return False
+
+        current = (stat.st_mtime_ns, stat.st_size)
+        changed = self._stat is not None and current != self._stat
+        self._stat = current
+        return changed
+
+    def _apply(self) -> None:
+        try:
+            with open(self.config.path, "rb") as f:
+                content = f.read()
+        except OSError as e:
+            print(f"Error reading changed config: {e}")
+            return
+
+        # Writes of the API were loaded already
+        if content_key(content) == self.config.key:
+            return
+
+        # Validated like an API update, so values of the wrong type never reach
+        # the animations. Imported here to keep the API out of the startup path.
+        from .api.config import ConfigModel
+
+        try:
+            ConfigModel(**yaml.load(content, YAML_LOADER))
+        except Exception as e:
+            # Validation errors list every animation the node could have been
+            summary = str(e).splitlines()[0] if str(e) else repr(e)
+            print(f"Changed config is invalid, keeping the current one: {summary}")
+            return
+
+        print("Config file changed, reloading...")
+        # The validated content is loaded, not whatever the file holds by now.
+        # Errors are reported by the reload itself.
+        self.config.reload(content)
+
+    def run(self) -> None:
+        self._fd = self._init_inotify()
+        wait = self._wait_inotify if self._fd is not None else self._wait_poll
+        changed_at = None
+
+        try:
+            while self.running:
+                if changed_at is None:
+                    timeout = 1.0
+                else:
+                    timeout = max(changed_at + self.debounce - time.monotonic(), 0)
+
+                if wait(timeout):
+                    # Every further write postpones the reload
+                    changed_at = time.monotonic()
+                elif (
+                    changed_at is not None
+                    and time.monotonic() - changed_at >= self.debounce
+                ):
+                    changed_at = None
+                    self._apply()
+        finally:
+            if self._fd is not None:
+                os.close(self._fd)
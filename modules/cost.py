@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+Per-frame cost estimate of animation configs
+
+Every animation function gets a linear cost model per LED call,
+    own cost = base + per_object * objects
+calibrated by a micro-benchmark on the running device. The cost of a config
+tree is the sum of its nodes, except for meta animations that only evaluate one
+child per call, which cost their most expensive child.
+
+The benchmark measures the CPU time of its own thread, so waiting for the GIL
+while the render thread runs does not count.
+"""
+
+import inspect
+import time
+from threading import Lock
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from rpi_ws2805 import RGBCCT
+
+from .animations.meta import HOLD_SAMPLES_PER_CYCLE
+from .config import ANIMATION_FUNCTIONS
+from .defaults import LED_FREQ_HZ
+from .types import LEDGeometry, Point, Rectangle, SceneContext
+
+# Meta animations that evaluate only one of their children per call
+SELECTS_ONE = {"alternate", "schedule"}
+
+# Target frame rate, configs estimated below it get a warning
+TARGET_FPS = 30.0
+# Configs estimated below TARGET_FPS / REJECT_FACTOR are rejected
+REJECT_FACTOR = 3.0
+
+# Number of people the estimate assumes on the floor
+DEFAULT_OBJECTS = 10
+
+BITS_PER_LED = 40  # 5 channels with 8 bits each
+
+BENCHMARK_LEDS = 32
+BENCHMARK_FRAMES = 20
+BENCHMARK_OBJECTS = 8
+
+
+def _is_color(node: Any) -> bool:
+    return isinstance(node, dict) and "r" in node and "g" in node and "b" in node
+
+
+def _is_animation_param(param: inspect.Parameter) -> bool:
+    return "SceneContext" in str(param.annotation)
+
+
+def _constant(*_args, **_kwargs) -> RGBCCT:
+    return RGBCCT()
+
+
+def _placeholder(param: inspect.Parameter) -> Any:
+    """
+    Stand-in for a required parameter that is not an animation, None if unknown
+    """
+
+    annotation = str(param.annotation)
+    if "List" in annotation and "RGBCCT" in annotation:
+        return [RGBCCT(r=255), RGBCCT(g=255), RGBCCT(b=255)]
+    return None
+
+
+def _with_rate(rate: Optional[float]):
+    """
+    Constant animation that declares a rate, stands in for a child animation
+    """
+
+    def constant(*_args, **_kwargs) -> RGBCCT:
+        return RGBCCT()
+
+    constant.rate = rate
+    return constant
+
+
+def _node_rate(node: Any) -> Optional[float]:
+    """
+    Rate of change of an animation config node in cycles per second as the
+    built animation declares it, None if unknown
+    """
+
+    if not isinstance(node, dict) or _is_color(node) or len(node) == 0:
+        return 0.0
+
+    name, args = next(iter(node.items()))
+    func = ANIMATION_FUNCTIONS.get(name)
+    if func is None or func is RGBCCT:
+        return 0.0
+
+    def stand_in(value: Any) -> Any:
+        if _is_color(value):
+            return RGBCCT(**value)
+        if isinstance(value, dict):
+            return _with_rate(_node_rate(value))
+        return value
+
+    # Built with its children replaced by constants that carry their rates
+    args = args or {}
+    var_args, kwargs = [], {}
+    for param in inspect.signature(func).parameters.values():
+        value = args.get(param.name)
+        if param.kind == inspect.Parameter.VAR_POSITIONAL:
+            var_args = [stand_in(v) for v in value or []]
+        elif isinstance(value, list):
+            kwargs[param.name] = [stand_in(v) for v in value]
+        elif value is not None:
+            kwargs[param.name] = stand_in(value)
+        elif param.default is inspect.Parameter.empty:
+            kwargs[param.name] = _placeholder(param)
+        elif callable(param.default) and _is_animation_param(param):
+            kwargs[param.name] = _with_rate(getattr(param.default, "rate", None))
+
+    try:
+        return getattr(func(*var_args, **kwargs), "rate", None)
+    except Exception:
+        return None
+
+
+class CostModel:
+    """
+    Calibrated lazily on the first estimate, which takes a fraction of a second
+    """
+
+    costs: Dict[str, Tuple[float, float]]  # Name -> (base, per object) in seconds
+    output: float  # Seconds per LED to hand colors to the strip, excluding the wire
+    calibrated: bool = False
+
+    def __init__(self) -> None:
+        self.costs = dict()
+        self.output = 0.0
+        self._lock = Lock()
+
+    def calibrate(self) -> None:
+        floor = Rectangle(Point(0, 0), Point(100, 500))
+        # A single strip along the floor
+        geometry = LEDGeometry(
+            index=np.arange(BENCHMARK_LEDS),
+            x=np.full(BENCHMARK_LEDS, 50.0),
+            y=500 * (np.arange(BENCHMARK_LEDS) + 0.5) / BENCHMARK_LEDS,
+            strip=np.zeros(BENCHMARK_LEDS, dtype=np.int64),
+            t=(np.arange(BENCHMARK_LEDS) + 0.5) / BENCHMARK_LEDS,
+        )
+        leds = geometry.leds
+        ctx = SceneContext(floor, geometry)
+        crowd = [
+            Point(50, 500 * (i + 0.5) / BENCHMARK_OBJECTS)
+            for i in range(BENCHMARK_OBJECTS)
+        ]
+
+        def per_call(func, objects: List[Point]) -> float:
+            tic = time.thread_time()
+            for frame in range(BENCHMARK_FRAMES):
+                t = frame / TARGET_FPS
+                for led in leds:
+                    func(t, ctx, led, objects)
+            return (time.thread_time() - tic) / (BENCHMARK_FRAMES * len(leds))
+
+        child_cost = per_call(_constant, [])
+
+        costs = {}
+        for name, func in ANIMATION_FUNCTIONS.items():
+            if func is RGBCCT:
+                continue
+
+            # Children are replaced by a constant animation to measure the node alone
+            args, kwargs, children = [], {}, 0
+            buildable = True
+            for param in inspect.signature(func).parameters.values():
+                if param.kind == inspect.Parameter.VAR_POSITIONAL:
+                    args.append(_constant)
+                    children += 1
+                elif _is_animation_param(param):
+                    kwargs[param.name] = _constant
+                    children += 1
+                elif param.default is inspect.Parameter.empty:
+                    kwargs[param.name] = _placeholder(param)
+                    if kwargs[param.name] is None:
+                        buildable = False
+
+            if not buildable:
+                continue
+
+            try:
+                idle_cost = per_call(func(*args, **kwargs), [])
+                crowd_cost = per_call(func(*args, **kwargs), crowd)
+            except Exception as e:
+                print(f"Error benchmarking animation {name}: {e}")
+                continue
+
+            base = max(idle_cost - children * child_cost, 0.0)
+            per_object = max(crowd_cost - idle_cost, 0.0) / BENCHMARK_OBJECTS
+            costs[name] = (base, per_object)
+
+        # Mirrors the LED controller's per-LED work around the animation call
+        colors = {led.index: RGBCCT(r=1) for led in leds}
+        tic = time.thread_time()
+        for _ in range(BENCHMARK_FRAMES):
+            _ = {led.index: _constant(0, ctx, led, []) for led in leds}
+            for led in leds:
+                RGBCCT(value=colors[led.index] & 0xFFFFFFFFFF)
+        self.output = (time.thread_time() - tic) / (BENCHMARK_FRAMES * len(leds))
+
+        self.costs = costs
+        self.calibrated = True
+
+    def _node_cost(self, node: Any, objects: int) -> float:
+        """
+        Seconds per LED of an animation config node and its children
+        """
+
+        if not isinstance(node, dict) or _is_color(node) or len(node) == 0:
+            return 0.0
+
+        name, args = next(iter(node.items()))
+        func = ANIMATION_FUNCTIONS.get(name)
+        if func is None or func is RGBCCT:
+            return 0.0
+
+        args = args or {}
+        children = []
+        for param in inspect.signature(func).parameters.values():
+            value = args.get(param.name, param.default)
+
+            if isinstance(value, dict):
+                children.append(self._node_cost(value, objects))
+            elif isinstance(value, list):
+                children.extend(self._node_cost(v, objects) for v in value)
+            elif callable(value) and _is_animation_param(param):
+                # Default child animation, named by its factory
+                default = value.__qualname__.split(".")[0]
+                children.append(self._node_cost({default: {}}, objects))
+
+        # Unknown costs are assumed to be like the most expensive known one
+        base, per_object = self.costs.get(
+            name, max(self.costs.values(), default=(0.0, 0.0))
+        )
+        own = base + per_object * objects
+
+        if name in SELECTS_ONE:
+            return own + max(children, default=0.0)
+        if name == "hold":
+            # Each LED evaluates its animation once per interval, in auto mode
+            # derived from the rate at the target frame rate
+            interval = args.get("frames", 0)
+            if interval == 0:
+                rate = _node_rate(args.get("animation"))
+                if rate:
+                    interval = int(TARGET_FPS / (rate * HOLD_SAMPLES_PER_CYCLE))
+            if interval > 1:
+                return own + sum(children) / interval
+        if name == "subsample" and args.get("step", 2) > 1:
+            # Roughly one LED in step evaluates the animation
+            return own + sum(children) / args.get("step", 2)
+        return own + sum(children)
+
+    def estimate(
+        self, animation: Any, leds: int, objects: int = DEFAULT_OBJECTS
+    ) -> Dict[str, Any]:
+        """
+        Estimated frame time of an animation config (as in config.yaml) for a
+        number of LEDs and people, and how it compares to the frame budget.
+        """
+
+        with self._lock:
+            if not self.calibrated:
+                self.calibrate()
+
+        per_led = self._node_cost(animation, objects)
+        animation_time = per_led * leds
+        output_time = self.output * leds
+        # The strip can only take the next frame once the last one was sent
+        wire_time = leds * BITS_PER_LED / LED_FREQ_HZ
+        frame_time = animation_time + output_time + wire_time
+
+        fps = 1.0 / frame_time if frame_time > 0 else float("inf")
+        if fps < TARGET_FPS / REJECT_FACTOR:
+            status = "reject"
+        elif fps < TARGET_FPS:
+            status = "warn"
+        else:
+            status = "ok"
+
+        return {
+            "status": status,
+            "leds": leds,
+            "objects": objects,
+            "per_led_us": round(per_led * 1e6, 2),
+            "animation_ms": round(animation_time * 1000, 2),
+            "output_ms": round((output_time + wire_time) * 1000, 2),
+            "frame_ms": round(frame_time * 1000, 2),
+            "fps": round(min(fps, 1000.0), 1),
+            "target_fps": TARGET_FPS,
+            "min_fps": round(TARGET_FPS / REJECT_FACTOR, 1),
+        }
+
+
+# Global cost model
+COST_MODEL = CostModel()
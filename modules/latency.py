@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+End-to-end latency tracing from XOVIS push to LEDs
+"""
+
+import collections
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+# Stages in pipeline order, "total" spans from receive to show() completion
+STAGES = ("projection", "pickup", "render", "show", "total")
+
+
+@dataclass
+class Stamps:
+    """
+    perf_counter() stamps of one object batch
+    """
+
+    received: float
+    projected: float = 0.0
+
+
+class ObjectBatch(list):
+    """
+    List of objects that remembers when it was received and projected
+    """
+
+    stamps: Optional[Stamps] = None
+
+
+class LatencyStats:
+    """
+    Rolling window of per-stage latencies in seconds.
+    Appends and reads of a deque are atomic, so no lock is needed.
+    """
+
+    _samples: Dict[str, collections.deque]
+
+    def __init__(self, maxlen: int = 500) -> None:
+        self._samples = {
+            stage: collections.deque(maxlen=maxlen)
+            for stage in STAGES + ("sensor_offset",)
+        }
+
+    def record_frame(
+        self, stamps: Stamps, pickup: float, rendered: float, shown: float
+    ) -> None:
+        """
+        Record the first frame that showed a batch
+        """
+
+        self._samples["projection"].append(stamps.projected - stamps.received)
+        self._samples["pickup"].append(pickup - stamps.projected)
+        self._samples["render"].append(rendered - pickup)
+        self._samples["show"].append(shown - rendered)
+        self._samples["total"].append(shown - stamps.received)
+
+    def record_sensor_offset(self, offset: float) -> None:
+        """
+        Receive wall clock time minus the XOVIS event timestamp. Includes the clock
+        skew between sensor and host, so only changes of it are meaningful.
+        """
+
+        self._samples["sensor_offset"].append(offset)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        Percentiles per stage in milliseconds
+        """
+
+        result = {}
+        for stage, samples in self._samples.items():
+            values = sorted(samples)
+            if len(values) == 0:
+                result[stage] = {"n": 0}
+                continue
+
+            def percentile(p: float) -> float:
+                return round(
+                    values[min(int(len(values) * p), len(values) - 1)] * 1000, 2
+                )
+
+            result[stage] = {
+                "n": len(values),
+                "min": round(values[0] * 1000, 2),
+                "p50": percentile(0.5),
+                "p95": percentile(0.95),
+                "p99": percentile(0.99),
+                "max": round(values[-1] * 1000, 2),
+            }
+
+        return result
+
+
+# Global latency statistics
+LATENCY = LatencyStats()
@@ -6,12 +6,12 @@ Controller Thread for Animations
 import collections
 import time
 from threading import Thread
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 
 from rpi_ws2805 import RGBCCT, PixelStrip
 
 from . import config
-from .config import CONFIG, GANGWAYConfig
+from .config import GANGWAYConfig
 from .defaults import (
     LED_BRIGHTNESS,
     LED_CHANNEL,
@@ -21,7 +21,10 @@ from .defaults import (
     LED_PIN,
     WS2805_STRIP,
 )
-from .types import LED, Animation, Point, Rectangle, SceneContext
+from .latency import LATENCY, Stamps
+from .types import LED, Animation, Point, Rectangle, Scene, SceneContext
+from .xovis.dispatch import LatestValue
+from .xovis.tracker import TrackSnapshot
 
 
 class LEDController(Thread):
@@ -30,37 +33,46 @@ class LEDController(Thread):
     """
 
     # Config
-    leds: List[LED]
     running: bool = True
     strip: PixelStrip
-    floor: Rectangle
-    animation: Animation | RGBCCT
+    scene: Scene
+    _scenes: LatestValue[Scene]
+    _scene_version: int = 0
 
     config: GANGWAYConfig
 
     # State
-    current_colors: Dict[int, RGBCCT]
+    # Scene and colors of the last frame, published as one reference so readers
+    # always get colors for exactly the scene's LEDs
+    frame: Tuple[Scene, Dict[int, RGBCCT]]
     last_objects: List[Point]  # An object is equivalent to a detected person
+    object_source: Optional[LatestValue[List[Point] | TrackSnapshot]] = None
+    _object_version: int = 0
+    _frame_stamps: Optional[Tuple[Stamps, float]] = None  # Batch stamps, pickup time
 
     # Time counters
     init_time: float
 
     # Stats
+    frame_number: int = 0
     fps: float = 0.0
     tpf_min: float = 0.0
     tpf_max: float = 0.0
     tpf_avg: float = 0.0
     _frame_times: collections.deque
 
-    def __init__(self, gangway_config: GANGWAYConfig = CONFIG) -> None:
+    def __init__(self, gangway_config: Optional[GANGWAYConfig] = None) -> None:
         super().__init__()
 
         self.init_time = time.time()
-        self.config = gangway_config
+        self.config = gangway_config or config.CONFIG
         self.last_objects = []
         self._frame_times = collections.deque(maxlen=100)
+        self._scenes = LatestValue()
 
-        self.reload_config()
+        self.scene = self.config.SCENE
+        self.frame = (self.scene, self._initial_colors(self.scene))
+        self.config.add_listener(self.apply_scene)
 
         self.__init_strip()
 
@@ -77,15 +89,44 @@ class LEDController(Thread):
         )
         self.strip.begin()
 
+    @property
+    def leds(self) -> List[LED]:
+        return self.scene.leds
+
+    @property
+    def floor(self) -> Rectangle:
+        return self.scene.floor
+
+    @property
+    def animation(self) -> Animation | RGBCCT:
+        return self.scene.animation
+
     def reload_config(self) -> None:
-        self.leds = self.config.LEDS
-        self.animation = self.config.ANIMATION
-        self.floor = self.config.FLOOR
+        self.apply_scene(self.config.SCENE)
+
+    def apply_scene(self, scene: Scene) -> None:
+        """
+        Render from a new scene. It is picked up at the next frame boundary, so a
+        frame never mixes two scenes and the caller never waits for the renderer.
+        """
 
-        if isinstance(self.animation, RGBCCT):
-            self.current_colors = {led.index: self.animation for led in self.leds}
-        else:
-            self.current_colors = {led.index: RGBCCT(cw=255) for led in self.leds}
+        self._scenes.put(scene)
+
+    def _initial_colors(self, scene: Scene) -> Dict[int, RGBCCT]:
+        if isinstance(scene.animation, RGBCCT):
+            return {led.index: scene.animation for led in scene.leds}
+        return {led.index: RGBCCT(cw=255) for led in scene.leds}
+
+    def _poll_scene(self) -> Scene:
+        version, scene = self._scenes.poll()
+
+        if version != self._scene_version:
+            self._scene_version = version
+            if scene.leds is not self.scene.leds:
+                self.frame = (scene, self._initial_colors(scene))
+            self.scene = scene
+
+        return self.scene
 
     @property
     def time(self) -> float:
@@ -103,31 +144,73 @@ class LEDController(Thread):
 
         self.last_objects = objects
 
-    def color_of(self, led: LED) -> RGBCCT:
+    def set_object_source(
+        self, source: LatestValue[List[Point] | TrackSnapshot]
+    ) -> None:
         """
-        Get the current color of an LED
+        Read objects from a latest-value slot once per frame instead of being pushed to.
+        If the slot holds tracks, positions are extrapolated to the time the frame
+        is expected to be visible.
         """
 
+        self.object_source = source
+
+    @property
+    def display_time(self) -> float:
+        """
+        Expected wall clock time at which the frame started now has been shown
+        """
+
+        return time.time() + self.tpf_avg
+
+    def _poll_objects(self) -> List[Point]:
+        if self.object_source is not None:
+            version, value = self.object_source.poll()
+
+            if version != self._object_version:
+                self._object_version = version
+                stamps = getattr(value, "stamps", None)
+                if stamps is not None:
+                    self._frame_stamps = (stamps, time.perf_counter())
+
+            if isinstance(value, TrackSnapshot):
+                self.last_objects = value.predict(self.display_time)
+            else:
+                self.last_objects = value or []
+
+        return self.last_objects
+
+    @property
+    def current_colors(self) -> Dict[int, RGBCCT]:
+        return self.frame[1]
+
+    def color_of(self, led: LED, colors: Optional[Dict[int, RGBCCT]] = None) -> RGBCCT:
+        """
+        Get the current color of an LED, or its color in colors
+        """
+
+        if colors is None:
+            colors = self.current_colors
+
         return RGBCCT(
-            value=self.current_colors[led.index] & 0xFFFFFFFFFF,
+            value=colors[led.index] & 0xFFFFFFFFFF,
         )
 
     def apply_colors(self, colors: Dict[int, RGBCCT]) -> None:
-        self.current_colors = colors
+        # Colors are always rendered from self.scene
+        self.frame = (self.scene, colors)
+        self.frame_number += 1
 
         _ = [
-            self.strip.setPixelColor(led.index, (c := self.color_of(led))) or c
-            for led in self.leds
+            self.strip.setPixelColor(led.index, (c := self.color_of(led, colors))) or c
+            for led in self.scene.leds
         ]  # Use Generator cause it is more efficient in python
 
         self.strip.show()
 
     @property
-    def context(self):
-        return SceneContext(
-            self.floor,
-            self.leds,
-        )
+    def context(self) -> SceneContext:
+        return self.scene.context
 
     @property
     def animate(self):
@@ -136,16 +219,23 @@ class LEDController(Thread):
         """
 
         while True:
+            # Scene, time and objects are read once so that every LED of a frame
+            # sees the same
+            scene = self._poll_scene()
+            objects = self._poll_objects()
+            animation = scene.animation
+            now = self.time
+
             yield {
-                led.index: self.animation
-                if isinstance(self.animation, RGBCCT)
-                else self.animation(
-                    self.time,
-                    self.context,
+                led.index: animation
+                if isinstance(animation, RGBCCT)
+                else animation(
+                    now,
+                    scene.context,
                     led,
-                    self.last_objects,
+                    objects,
                 )
-                for led in self.leds
+                for led in scene.leds
             }
 
     def run(self) -> None:
@@ -157,6 +247,9 @@ class LEDController(Thread):
         last_frame_start = time.perf_counter()
 
         for colors in self.animate:
+            rendered = time.perf_counter()
+            frame_stamps, self._frame_stamps = self._frame_stamps, None
+
             # Measure time since last frame start (Total Frame Time)
             now = time.perf_counter()
             dt = now - last_frame_start
@@ -173,5 +266,9 @@ class LEDController(Thread):
 
             self.apply_colors(colors)
 
+            if frame_stamps is not None:
+                stamps, pickup = frame_stamps
+                LATENCY.record_frame(stamps, pickup, rendered, time.perf_counter())
+
             if not self.running:
                 break
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Compiled config artefacts next to config.yaml for fast cold starts
+
+For every config file content (by hash) the cache holds:
+    <hash>.json      The parsed config, so YAML parsing is skipped
+    <hash>.leds.npy  LED geometry as float64 with one row per field (index, x, y,
+                     strip, t), memory-mapped
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+CACHE_DIR = ".scene-cache"
+
+# Part of every key, increase it when the artefacts change so that those built
+# by older code are not reused
+CACHE_VERSION = 2
+
+
+def content_key(content: bytes) -> str:
+    digest = hashlib.sha256(f"{CACHE_VERSION}\n".encode())
+    digest.update(content)
+    return digest.hexdigest()[:16]
+
+
+def _paths(config_path: Path, key: str) -> Tuple[Path, Path]:
+    directory = Path(config_path).parent / CACHE_DIR
+    return directory / f"{key}.json", directory / f"{key}.leds.npy"
+
+
+def load_compiled(
+    config_path: Path, key: str
+) -> Optional[Tuple[Dict[str, Any], np.ndarray]]:
+    """
+    Returns (parsed config, LED geometry) if the cache has them for key
+    """
+
+    tree_path, leds_path = _paths(config_path, key)
+    if not tree_path.exists() or not leds_path.exists():
+        return None
+
+    try:
+        with open(tree_path, "r") as f:
+            data = json.load(f)
+        geometry = np.load(leds_path, mmap_mode="r")
+    except Exception as e:
+        print(f"Error reading scene cache {key}: {e}")
+        return None
+
+    if geometry.ndim != 2 or geometry.shape[0] != 5:
+        return None
+
+    return data, geometry
+
+
+def store_compiled(
+    config_path: Path, key: str, data: Dict[str, Any], geometry: np.ndarray
+) -> None:
+    """
+    Writes the artefacts for key and drops those of other config versions.
+    The cache is optional, failures are only reported.
+    """
+
+    tree_path, leds_path = _paths(config_path, key)
+
+    try:
+        tree = json.dumps(data)
+    except (TypeError, ValueError):
+        # YAML types without a JSON equivalent (e.g. dates), not worth caching
+        return
+
+    try:
+        tree_path.parent.mkdir(exist_ok=True)
+
+        # Written aside and renamed, so a reader never sees a partial file
+        tmp_leds = leds_path.with_name(f"{key}.tmp.npy")
+        np.save(tmp_leds, np.asarray(geometry, dtype=np.float64))
+        os.replace(tmp_leds, leds_path)
+
+        tmp_tree = tree_path.with_suffix(".tmp")
+        with open(tmp_tree, "w") as f:
+            f.write(tree)
+        os.replace(tmp_tree, tree_path)
+
+        for path in tree_path.parent.iterdir():
+            if not path.name.startswith(key):
+                path.unlink()
+    except OSError as e:
+        print(f"Error writing scene cache: {e}")
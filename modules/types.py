@@ -1,6 +1,8 @@
 from dataclasses import dataclass
+from functools import cached_property
 from typing import Callable, Iterable, List, Tuple, Union
 
+import numpy as np
 from rpi_ws2805 import RGBCCT
 
 
@@ -63,16 +65,110 @@ class Strip:
     end: Point
 
 
+@dataclass
+class Sensor:
+    name: str
+    src_points: List[Tuple[float, float]]
+    dst_points: List[Tuple[float, float]]
+    cutout: List[Tuple[float, float]]  # Sensor image area people are taken from
+
+
 @dataclass
 class LED:
     index: int
     p: Point
 
 
+@dataclass(eq=False)
+class LEDGeometry:
+    """
+    Positions of all LEDs as arrays, one entry per LED in strip order
+    """
+
+    index: np.ndarray  # LED index on the wire
+    x: np.ndarray
+    y: np.ndarray
+    strip: np.ndarray  # Position of the LED's strip in the strip list
+    t: np.ndarray  # Position along the strip, 0 at its start and 1 at its end
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    @cached_property
+    def leds(self) -> List[LED]:
+        """
+        LED objects for code working on single LEDs, built on first use
+        """
+
+        return [
+            LED(index, Point(x, y))
+            for index, x, y in zip(
+                self.index.tolist(), self.x.tolist(), self.y.tolist()
+            )
+        ]
+
+    @property
+    def fields(self) -> np.ndarray:
+        """
+        float64 array with one row per field: index, x, y, strip, t
+        """
+
+        return np.stack([self.index, self.x, self.y, self.strip, self.t])
+
+    @classmethod
+    def from_fields(cls, fields: np.ndarray) -> "LEDGeometry":
+        """
+        Rows are contiguous, so x, y and t stay views of a memory-mapped array.
+        index and strip are converted to integers.
+        """
+
+        return LEDGeometry(
+            index=fields[0].astype(np.int64),
+            x=fields[1],
+            y=fields[2],
+            strip=fields[3].astype(np.int64),
+            t=fields[4],
+        )
+
+    @classmethod
+    def from_strips(cls, strips: List["Strip"]) -> "LEDGeometry":
+        """
+        Spreads every strip's LEDs evenly between its start and end, each LED at
+        the center of its segment
+        """
+
+        lengths = np.array([s.len for s in strips], dtype=np.int64)
+        strip = np.repeat(np.arange(len(strips)), lengths)
+        # Position of every LED within its strip
+        i = np.arange(len(strip)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+
+        def per_led(values: List[float]) -> np.ndarray:
+            return np.array(values, dtype=np.float64)[strip]
+
+        start_x = per_led([s.start.x for s in strips])
+        start_y = per_led([s.start.y for s in strips])
+        end_x = per_led([s.end.x for s in strips])
+        end_y = per_led([s.end.y for s in strips])
+        length = lengths[strip]
+
+        # Same operation order as helpers.interpolate_points
+        return LEDGeometry(
+            index=i + np.array([s.index for s in strips], dtype=np.int64)[strip],
+            x=(end_x - start_x) / length * (i + 0.5) + start_x,
+            y=(end_y - start_y) / length * (i + 0.5) + start_y,
+            strip=strip,
+            t=(i + 0.5) / length,
+        )
+
+
 @dataclass
 class SceneContext:
     floor: Rectangle
-    leds: List[LED]
+    geometry: LEDGeometry  # Positions and strip layout of all LEDs
+
+    @property
+    def leds(self) -> List[LED]:
+        return self.geometry.leds
 
 
 Animation = Callable[
@@ -84,3 +180,26 @@ Animation = Callable[
     ],
     RGBCCT,
 ]
+
+
+@dataclass
+class Scene:
+    """
+    Everything a frame is rendered from. Replaced as a whole on config reloads,
+    never modified.
+    """
+
+    version: int
+    floor: Rectangle
+    geometry: LEDGeometry
+    animation: Union[Animation, RGBCCT]
+    context: SceneContext
+
+    @property
+    def leds(self) -> List[LED]:
+        """
+        LED objects of the geometry, built when the renderer or the API first
+        needs them instead of on every load
+        """
+
+        return self.geometry.leds
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Compact log of raw XOVIS pushes for later replay
+
+File layout: MAGIC, then one record per push:
+    <receive time: float64> <sensor name length: uint16> <body length: uint32>
+    <sensor name: utf-8> <raw POST body>
+"""
+
+import struct
+import time
+from pathlib import Path
+from threading import Lock
+from typing import BinaryIO, Iterator, Optional, Tuple
+
+MAGIC = b"XOVISCAP1\n"
+HEADER = struct.Struct("<dHI")
+
+
+class CaptureWriter:
+    """
+    Appends pushes to a capture file. Thread-safe, flushed at most once a second.
+    """
+
+    path: Path
+    records: int = 0
+
+    _file: BinaryIO
+    _last_flush: float
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self._lock = Lock()
+        is_new = not self.path.exists() or self.path.stat().st_size == 0
+        self._file = open(self.path, "ab")
+        if is_new:
+            self._file.write(MAGIC)
+        self._last_flush = time.monotonic()
+
+    def write(self, body: bytes, sensor: Optional[str] = None) -> None:
+        received = time.time()
+        name = (sensor or "").encode()
+
+        with self._lock:
+            self._file.write(HEADER.pack(received, len(name), len(body)))
+            self._file.write(name)
+            self._file.write(body)
+            self.records += 1
+
+            now = time.monotonic()
+            if now - self._last_flush > 1.0:
+                self._file.flush()
+                self._last_flush = now
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+def read_capture(path: Path) -> Iterator[Tuple[float, Optional[str], bytes]]:
+    """
+    Yields (receive time, sensor name or None, raw body) per recorded push.
+    """
+
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a XOVIS capture file")
+
+        while True:
+            header = f.read(HEADER.size)
+            if len(header) < HEADER.size:
+                return
+
+            received, name_len, body_len = HEADER.unpack(header)
+            name = f.read(name_len).decode()
+            body = f.read(body_len)
+            if len(body) < body_len:
+                # Truncated last record, e.g. the service was killed while capturing
+                return
+
+            yield received, name or None, body
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Decoupled delivery of XOVIS data to consumers
+"""
+
+import collections
+from threading import Condition, Thread
+from typing import Any, Callable, Dict, Generic, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class LatestValue(Generic[T]):
+    """
+    Single-slot mailbox that only keeps the newest value.
+    Reads and writes are single attribute accesses (atomic in CPython), so neither
+    the writer nor the readers ever block. Intended for exactly one writer.
+    """
+
+    _slot: Tuple[int, Optional[T]]
+
+    def __init__(self, value: Optional[T] = None) -> None:
+        self._slot = (0, value)
+
+    def put(self, value: T) -> None:
+        self._slot = (self._slot[0] + 1, value)
+
+    def get(self) -> Optional[T]:
+        return self._slot[1]
+
+    def poll(self) -> Tuple[int, Optional[T]]:
+        """
+        Returns (version, value). The version increases with every put.
+        """
+
+        return self._slot
+
+
+class SubscriberWorker(Thread):
+    """
+    Delivers items to a single callback on its own thread through a bounded queue.
+    If the callback falls behind, the oldest queued items are dropped and counted.
+    """
+
+    callback: Callable[[Any], None]
+    running: bool = True
+
+    # Stats
+    delivered: int = 0
+    dropped: int = 0
+
+    _queue: collections.deque
+    _condition: Condition
+
+    def __init__(
+        self, callback: Callable[[Any], None], maxlen: int = 64, name: str = ""
+    ) -> None:
+        super().__init__(name=name or getattr(callback, "__qualname__", "subscriber"))
+        self.daemon = True
+        self.callback = callback
+        self._queue = collections.deque(maxlen=maxlen)
+        self._condition = Condition()
+
+    def submit(self, item: Any) -> None:
+        with self._condition:
+            if len(self._queue) == self._queue.maxlen:
+                self.dropped += 1
+            self._queue.append(item)
+            self._condition.notify()
+
+    def stop(self) -> None:
+        with self._condition:
+            self.running = False
+            self._condition.notify()
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "queued": len(self._queue),
+        }
+
+    def run(self) -> None:
+        while True:
+            with self._condition:
+                while self.running and len(self._queue) == 0:
+                    self._condition.wait()
+
+                if not self.running:
+                    return
+
+                item = self._queue.popleft()
+
+            try:
+                self.callback(item)
+            except Exception as e:
+                print(f"Error in XOVIS subscriber {self.name}: {e}")
+
+            self.delivered += 1
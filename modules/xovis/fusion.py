@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Fusion of people seen by several sensors in overlapping zones
+"""
+
+import math
+from typing import Dict, List, Tuple
+
+from ..types import Point
+
+
+def fuse(points: List[Tuple[str, Point]], radius: float) -> List[List[int]]:
+    """
+    Groups points of different sensors that are closer than radius.
+    points: (sensor name, floor position) per track.
+    Returns groups of indices into points. Points of the same sensor are never merged,
+    since one sensor already separates the people it sees.
+
+    Uses a spatial hash with a cell size of radius, so each point only has to be
+    compared with the groups in its 3x3 cell neighbourhood: O(n) for n points,
+    independent of the number of sensors.
+    """
+
+    if radius <= 0:
+        return [[i] for i in range(len(points))]
+
+    groups: List[List[int]] = []
+    centers: List[Tuple[float, float]] = []
+    sensors: List[set] = []
+    cells: Dict[Tuple[int, int], List[int]] = {}
+    radius_sq = radius**2
+
+    for i, (sensor, p) in enumerate(points):
+        cx = math.floor(p.x / radius)
+        cy = math.floor(p.y / radius)
+
+        best = -1
+        best_dist_sq = radius_sq
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                for g in cells.get((cx + dx, cy + dy), ()):
+                    if sensor in sensors[g]:
+                        continue
+                    dist_sq = (centers[g][0] - p.x) ** 2 + (centers[g][1] - p.y) ** 2
+                    if dist_sq < best_dist_sq:
+                        best = g
+                        best_dist_sq = dist_sq
+
+        if best < 0:
+            cells.setdefault((cx, cy), []).append(len(groups))
+            groups.append([i])
+            centers.append((p.x, p.y))
+            sensors.append({sensor})
+            continue
+
+        # The group keeps its cell, the center only moves by less than radius
+        n = len(groups[best])
+        centers[best] = (
+            (centers[best][0] * n + p.x) / (n + 1),
+            (centers[best][1] * n + p.y) / (n + 1),
+        )
+        groups[best].append(i)
+        sensors[best].add(sensor)
+
+    return groups
@@ -3,7 +3,6 @@
 Project points from image space to floor space
 """
 
-import cv2
 import numpy as np
 
 from .. import config
@@ -19,6 +18,9 @@ def get_homography(src=None, dst=None):
     if dst is None:
         dst = np.array(config.CONFIG.DST_POINTS)
 
+    # OpenCV takes long to import, only load it when it is needed
+    import cv2
+
     return cv2.getPerspectiveTransform(
         np.array(src, dtype=np.float32), np.array(dst, dtype=np.float32)
     )
@@ -39,3 +41,24 @@ def apply_transform(points, M=None):
 
     # Normalisierung (Division durch w-Komponente)
     return transformed[:, :2] / transformed[:, 2, np.newaxis]
+
+
+def inside_polygon(points, polygon) -> np.ndarray:
+    """
+    Whether each point lies inside the polygon (even-odd rule).
+    points: (N, 2) array, polygon: (M, 2) array of its corners in order
+    """
+
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    polygon = np.asarray(polygon, dtype=np.float64)
+    x, y = points[:, 0, np.newaxis], points[:, 1, np.newaxis]
+    x1, y1 = polygon[:, 0], polygon[:, 1]
+    x2, y2 = np.roll(x1, -1), np.roll(y1, -1)
+
+    # Edges crossed by a ray from each point towards +x
+    spans = (y1 > y) != (y2 > y)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        crossing_x = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+    crossings = np.count_nonzero(spans & (x < crossing_x), axis=1)
+
+    return crossings % 2 == 1
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Replays a XOVIS capture (see capture.py) over HTTP or in-process
+
+    python3 -m modules.xovis.replay capture.bin                   # 1x to localhost:8081
+    python3 -m modules.xovis.replay capture.bin --speed 4         # 4x
+    python3 -m modules.xovis.replay capture.bin --speed 0 --in-process  # max speed
+"""
+
+import argparse
+import json
+import time
+import urllib.request
+from pathlib import Path
+from typing import Callable, List, Optional
+
+from .capture import read_capture
+
+
+def replay(
+    path: Path,
+    send: Callable[[Optional[str], bytes], None],
+    speed: float = 1.0,
+) -> List[float]:
+    """
+    Sends every recorded push, keeping the recorded spacing divided by speed.
+    speed <= 0 sends as fast as possible. Returns the send duration of every push.
+    """
+
+    durations = []
+    first_received = None
+    start = time.perf_counter()
+
+    for received, sensor, body in read_capture(path):
+        if first_received is None:
+            first_received = received
+
+        if speed > 0:
+            delay = start + (received - first_received) / speed - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+        t = time.perf_counter()
+        send(sensor, body)
+        durations.append(time.perf_counter() - t)
+
+    return durations
+
+
+def http_sender(url: str) -> Callable[[Optional[str], bytes], None]:
+    def send(sensor: Optional[str], body: bytes) -> None:
+        request = urllib.request.Request(
+            f"{url.rstrip('/')}/{sensor or ''}",
+            data=body,
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        with urllib.request.urlopen(request) as response:
+            response.read()
+
+    return send
+
+
+def in_process_sender() -> Callable[[Optional[str], bytes], None]:
+    from .server import XOVISServer
+
+    server = XOVISServer()
+
+    def send(sensor: Optional[str], body: bytes) -> None:
+        server._notify(json.loads(body), sensor if sensor in server.sensors else None)
+
+    return send
+
+
+def _percentile(values: List[float], p: float) -> float:
+    values = sorted(values)
+    return values[min(int(len(values) * p), len(values) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a XOVIS capture")
+    parser.add_argument("capture", type=Path, help="Capture file to replay")
+    parser.add_argument(
+        "--speed",
+        type=float,
+        default=1.0,
+        help="Replay speed factor, 0 for as fast as possible",
+    )
+    parser.add_argument(
+        "--url", default="http://localhost:8081", help="XOVIS receiver to post to"
+    )
+    parser.add_argument(
+        "--in-process",
+        action="store_true",
+        help="Feed an in-process XOVISServer instead of posting over HTTP",
+    )
+    args = parser.parse_args()
+
+    send = in_process_sender() if args.in_process else http_sender(args.url)
+
+    start = time.perf_counter()
+    durations = replay(args.capture, send, args.speed)
+    elapsed = time.perf_counter() - start
+
+    if len(durations) == 0:
+        print("Capture is empty")
+        return
+
+    print(f"Pushes: {len(durations)} in {elapsed:.2f} s")
+    print(f"Throughput: {len(durations) / elapsed:.1f} pushes/s")
+    print(
+        "Ingest (ms): "
+        f"p50 {_percentile(durations, 0.5) * 1000:.2f}  "
+        f"p95 {_percentile(durations, 0.95) * 1000:.2f}  "
+        f"max {max(durations) * 1000:.2f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
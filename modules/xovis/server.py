@@ -4,26 +4,48 @@ Web Server to receive XOVIS-Events and forward them to listening threads
 """
 
 import collections
+import heapq
 import json
 import time
 from http.server import BaseHTTPRequestHandler, HTTPServer
+from pathlib import Path
 from threading import Lock, Thread
-from typing import Callable, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
+import numpy as np
+
+from .. import config
 from ..config import Point
-from .homographic_projection import apply_transform
+from ..latency import LATENCY, ObjectBatch, Stamps
+from ..types import Scene
+from .capture import CaptureWriter
+from .dispatch import LatestValue, SubscriberWorker
+from .fusion import fuse
+from .homographic_projection import apply_transform, get_homography, inside_polygon
 from .model import DeleteTrack, Event, EventObject, create_events_from_json
+from .tracker import Tracker, TrackSnapshot
 
 
 def create_xovis_request_handler(server: "XOVISServer"):
     class RequestHandler(BaseHTTPRequestHandler):
         def do_POST(self):
+            received = time.perf_counter()
             content_length = int(self.headers["Content-Length"])
             post_data = self.rfile.read(content_length)
 
+            # Each sensor pushes to its own path, "/" is the first sensor
+            sensor = self.path.strip("/") or None
+            if sensor is not None and sensor not in server.sensors:
+                self.send_response(404)
+                self.end_headers()
+                return
+
+            if server.capture is not None:
+                server.capture.write(post_data, sensor)
+
             try:
                 data = json.loads(post_data)
-                server._notify(data)
+                server._notify(data, sensor, received)
                 self.send_response(200)
                 self.end_headers()
             except json.JSONDecodeError:
@@ -38,32 +60,162 @@ def create_xovis_request_handler(server: "XOVISServer"):
 
 
 class XOVISServer:
-    _subscribers: List[Tuple[Callable[[Event], None], Optional[List[Event]]]]
-    _subscribers_position: List[Callable[[List[Point]], None]]
+    """
+    Receives XOVIS pushes. The HTTP handler only parses and projects; consumers are
+    decoupled from it. Positions are published to the lock-free `positions` slot
+    (read once per frame by the LEDController), while subscribers are served by
+    one worker each, so a slow consumer can neither delay the sensor nor the others.
+    `tracks` additionally carries velocity estimates to extrapolate positions with.
+    Tracks that are not updated for `track_ttl` seconds are evicted, so a lost
+    DeleteTrack cannot leave a ghost behind.
+
+    Several sensors can push to /<sensor name>. Tracks are kept per sensor and
+    projected with that sensor's homography when they change; people seen by
+    more than one sensor are merged into one object before publishing.
+    """
+
+    positions: LatestValue[List[Point]]
+    tracks: LatestValue[TrackSnapshot]
+    capture: Optional[CaptureWriter] = None
+
+    _subscribers: List[Tuple[SubscriberWorker, Optional[List[Event]]]]
+    _subscribers_position: List[SubscriberWorker]
     _host: str
     _port: int
 
-    _objects: Dict[int, EventObject]
-    _timestamps: Dict[int, int]
+    sensors: Dict[str, Any]  # Sensor name -> homography
+    _cutouts: Dict[str, Optional[np.ndarray]]  # Sensor name -> area it detects in
+
+    # Tracks are keyed by (sensor name, XOVIS track id)
+    _objects: Dict[Tuple[str, int], EventObject]
+    _timestamps: Dict[Tuple[str, int], int]
+    _floor: Dict[Tuple[str, int], Point]
+    _fusion_radius: float
     _update_times: collections.deque
+    _tracker: Tracker
+
+    # Expiry: one live heap entry per track, refreshed lazily when it reaches the
+    # top. _scheduled holds the deadline of each track's live entry, any other
+    # entry of the track is stale and skipped.
+    _ttl: float
+    _deadlines: Dict[Tuple[str, int], float]
+    _scheduled: Dict[Tuple[str, int], float]
+    _expiry: List[Tuple[float, Tuple[str, int]]]
+
+    # Stats
+    deleted: int = 0
+    evicted: int = 0
 
     def __init__(self, host: str = "0.0.0.0", port: int = 8081) -> None:
         self._host = host
         self._port = port
         self._subscribers = list()
         self._subscribers_position = list()
+        self._apply_sensors()
         self._objects = dict()
         self._timestamps = dict()
+        self._floor = dict()
         self._update_times = collections.deque(maxlen=100)
         self._lock = Lock()
+        self._track_lock = Lock()
+        self._ttl = config.CONFIG.TRACK_TTL
+        self._deadlines = dict()
+        self._scheduled = dict()
+        self._expiry = list()
+        self.positions = LatestValue([])
+        self._tracker = Tracker(
+            alpha=config.CONFIG.TRACKER_ALPHA,
+            beta=config.CONFIG.TRACKER_BETA,
+            max_horizon=config.CONFIG.PREDICTION_HORIZON,
+        )
+        self.tracks = LatestValue(self._tracker.snapshot())
+        config.CONFIG.add_listener(self._apply_config)
+
+    def _apply_sensors(self) -> None:
+        self.sensors = {
+            sensor.name: get_homography(src=sensor.src_points, dst=sensor.dst_points)
+            for sensor in config.CONFIG.SENSORS
+        }
+        self._cutouts = {
+            sensor.name: (
+                np.array(sensor.cutout, dtype=np.float64)
+                if len(sensor.cutout) >= 3
+                else None
+            )
+            for sensor in config.CONFIG.SENSORS
+        }
+        self._default_sensor = config.CONFIG.SENSORS[0].name
+        self._fusion_radius = config.CONFIG.FUSION_RADIUS
+
+    def _apply_config(self, _scene: Scene) -> None:
+        """
+        Takes over settings changed by a config reload. Tracks of sensors that
+        were removed are dropped, the TTL applies to tracks from their next update.
+        """
+
+        with self._track_lock:
+            self._apply_sensors()
+            for track_id in [
+                key for key in self._objects if key[0] not in self.sensors
+            ]:
+                self._remove_track(track_id)
+
+            self._ttl = config.CONFIG.TRACK_TTL
+            self._tracker.alpha = config.CONFIG.TRACKER_ALPHA
+            self._tracker.beta = config.CONFIG.TRACKER_BETA
+            self._tracker.max_horizon = config.CONFIG.PREDICTION_HORIZON
+
+            self._publish()
 
     def subscribe(
-        self, callback: Callable[[Event], None], filter: Optional[List[Event]]
-    ) -> None:
-        self._subscribers.append((callback, filter))
+        self,
+        callback: Callable[[Event], None],
+        filter: Optional[List[Event]],
+        maxlen: int = 256,
+    ) -> SubscriberWorker:
+        worker = SubscriberWorker(callback, maxlen=maxlen)
+        worker.start()
+        self._subscribers.append((worker, filter))
+        return worker
+
+    def subscribe_position(
+        self, callback: Callable[[List[Point]], None]
+    ) -> SubscriberWorker:
+        """
+        Position subscribers only ever receive the newest positions (latest wins).
+        """
+
+        worker = SubscriberWorker(callback, maxlen=1)
+        worker.start()
+        self._subscribers_position.append(worker)
+        return worker
+
+    def start_capture(self, path: Path) -> None:
+        """
+        Append every raw push to a capture file for replay (see replay.py).
+        """
+
+        self.capture = CaptureWriter(path)
+        print(f"Capturing XOVIS pushes to {path}")
 
-    def subscribe_position(self, callback: Callable[[List[Point]], None]) -> None:
-        self._subscribers_position.append(callback)
+    def stop_capture(self) -> None:
+        if self.capture is not None:
+            self.capture.close()
+            self.capture = None
+
+    @property
+    def subscriber_stats(self) -> List[Dict[str, Any]]:
+        return [worker.stats for worker, _ in self._subscribers] + [
+            worker.stats for worker in self._subscribers_position
+        ]
+
+    @property
+    def track_stats(self) -> Dict[str, int]:
+        return {
+            "active": len(self._objects),
+            "deleted": self.deleted,
+            "evicted": self.evicted,
+        }
 
     @property
     def ups(self) -> int:
@@ -73,7 +225,15 @@ class XOVISServer:
                 self._update_times.popleft()
             return len(self._update_times)
 
-    def _notify(self, data) -> None:
+    def _notify(
+        self, data, sensor: Optional[str] = None, received: Optional[float] = None
+    ) -> None:
+        """
+        received: perf_counter() when the push arrived, defaults to now
+        """
+
+        stamps = Stamps(received=received or time.perf_counter())
+
         now = time.time()
         with self._lock:
             self._update_times.append(now)
@@ -82,36 +242,159 @@ class XOVISServer:
 
         events = create_events_from_json(data)
 
+        if len(events) > 0:
+            LATENCY.record_sensor_offset(
+                now - max(event.timestamp for event in events) / 1000
+            )
+
         self._notify_event(events)
-        self._notify_position(events)
+        self._notify_position(events, sensor or self._default_sensor, stamps)
 
     def _notify_event(self, events) -> None:
         for event in events:
-            for callback, event_filter in self._subscribers:
+            for worker, event_filter in self._subscribers:
                 if event_filter is None or type(event) in event_filter:
-                    callback(event)
+                    worker.submit(event)
 
-    def _notify_position(self, events) -> None:
-        for event in events:
-            if isinstance(event, DeleteTrack) and event.object.id in self._objects:
-                self._objects.pop(event.object.id)
-            elif (
-                event.object.id not in self._objects
-                or event.timestamp > self._timestamps[event.object.id]
-            ):
-                self._objects[event.object.id] = event.object
-                self._timestamps[event.object.id] = event.timestamp
-
-        if len(self._objects) == 0:
-            for callback in self._subscribers_position:
-                callback([])
+    def _notify_position(self, events, sensor: str, stamps: Stamps) -> None:
+        received = time.time()
+        now = time.monotonic()
+        updated = set()
+
+        with self._track_lock:
+            for event in events:
+                track_id = (sensor, event.object.id)
+
+                if isinstance(event, DeleteTrack):
+                    if track_id in self._objects:
+                        self._remove_track(track_id)
+                        self.deleted += 1
+                    updated.discard(track_id)
+                elif (
+                    track_id not in self._objects
+                    or event.timestamp > self._timestamps[track_id]
+                ):
+                    if self._ttl > 0 and track_id not in self._scheduled:
+                        heapq.heappush(self._expiry, (now + self._ttl, track_id))
+                        self._scheduled[track_id] = now + self._ttl
+                    self._deadlines[track_id] = now + self._ttl
+                    self._objects[track_id] = event.object
+                    self._timestamps[track_id] = event.timestamp
+                    updated.add(track_id)
+
+            self._expire(now)
+            self._project(sensor, updated, received)
+            self._publish(stamps)
+
+    def _remove_track(self, track_id: Tuple[str, int]) -> None:
+        self._objects.pop(track_id, None)
+        self._timestamps.pop(track_id, None)
+        self._floor.pop(track_id, None)
+        self._deadlines.pop(track_id, None)
+        self._scheduled.pop(track_id, None)
+        self._tracker.remove(track_id)
+
+    def _expire(self, now: float) -> int:
+        """
+        Evict tracks whose deadline passed. Only looks at the top of the heap.
+        """
+
+        if self._ttl <= 0:
+            return 0
+
+        evicted = 0
+        while len(self._expiry) > 0 and self._expiry[0][0] <= now:
+            scheduled, track_id = heapq.heappop(self._expiry)
+
+            if self._scheduled.get(track_id) != scheduled:
+                # Deleted (and possibly re-created) in the meantime
+                continue
+
+            deadline = self._deadlines[track_id]
+            if deadline > now:
+                # Refreshed in the meantime
+                heapq.heappush(self._expiry, (deadline, track_id))
+                self._scheduled[track_id] = deadline
+                continue
+
+            self._remove_track(track_id)
+            evicted += 1
+
+        self.evicted += evicted
+        return evicted
+
+    def _reap(self) -> None:
+        """
+        Expires tracks even if the sensor stops pushing.
+        """
+
+        while True:
+            # The TTL may change with config reloads
+            time.sleep(min(max(self._ttl / 4, 0.25), 5.0) if self._ttl > 0 else 1.0)
+            with self._track_lock:
+                if self._expire(time.monotonic()) > 0:
+                    self._publish()
+
+    def _project(self, sensor: str, updated, received: float) -> None:
+        """
+        Projects only the tracks updated by this push to floor space.
+        """
+
+        keys = [key for key in updated if key in self._objects]
+        if len(keys) == 0:
             return
 
-        points = [(object.x, object.y) for object in self._objects.values()]
-        mapped_points = [Point(r[0], r[1]) for r in apply_transform(points)]
+        points = [(self._objects[key].x, self._objects[key].y) for key in keys]
+
+        # People outside the sensor's cutout are left to the neighbouring sensors
+        cutout = self._cutouts.get(sensor)
+        if cutout is not None:
+            inside = inside_polygon(points, cutout)
+            for key in [key for key, keep in zip(keys, inside) if not keep]:
+                self._floor.pop(key, None)
+                self._tracker.remove(key)
+            keys = [key for key, keep in zip(keys, inside) if keep]
+            points = [point for point, keep in zip(points, inside) if keep]
+            if len(keys) == 0:
+                return
+
+        for key, r in zip(keys, apply_transform(points, self.sensors[sensor])):
+            point = Point(r[0], r[1])
+            self._floor[key] = point
+            self._tracker.update(key, point, self._timestamps[key], received)
 
-        for callback in self._subscribers_position:
-            callback(mapped_points)
+    def _publish(self, stamps: Optional[Stamps] = None) -> None:
+        keys = list(self._floor.keys())
+
+        if len(self.sensors) == 1:
+            mapped_points = [self._floor[key] for key in keys]
+            snapshot = self._tracker.snapshot()
+        else:
+            groups = fuse(
+                [(key[0], self._floor[key]) for key in keys], self._fusion_radius
+            )
+            mapped_points = [
+                Point(
+                    sum(self._floor[keys[i]].x for i in group) / len(group),
+                    sum(self._floor[keys[i]].y for i in group) / len(group),
+                )
+                for group in groups
+            ]
+            snapshot = self._tracker.snapshot(
+                [[keys[i] for i in group] for group in groups]
+            )
+
+        mapped_points = ObjectBatch(mapped_points)
+        if stamps is not None:
+            stamps.projected = time.perf_counter()
+            mapped_points.stamps = stamps
+            snapshot.stamps = stamps
+
+        self.positions.put(mapped_points)
+        self.tracks.put(snapshot)
+
+        for worker in self._subscribers_position:
+            worker.submit(mapped_points)
 
     def start_server(self) -> HTTPServer:
         handler = create_xovis_request_handler(self)
@@ -119,5 +402,10 @@ class XOVISServer:
         thread = Thread(target=http_server.serve_forever)
         thread.daemon = True
         thread.start()
+
+        reaper = Thread(target=self._reap)
+        reaper.daemon = True
+        reaper.start()
+
         print(f"XOVIS callback server receiver running on {self._host}:{self._port}")
         return http_server
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Synthetic crowd that drives the XOVIS ingest without a physical sensor
+
+    python3 -m modules.xovis.simulator --people 50 --rate 10
+    python3 -m modules.xovis.simulator --ramp 0,25,50,100,200 --step 20 --api http://localhost:8082
+    python3 -m modules.xovis.simulator --people 200 --in-process --duration 10
+
+People enter at one end of the floor and walk along its long axis with individual
+speed and sway. Positions are converted to sensor coordinates with the inverse
+homography and sent as XOVIS event batches: CreateTrack on entry, a CreateTrack
+with a newer timestamp for every position update (which is how the ingest treats
+positions) and DeleteTrack once a person left the floor.
+"""
+
+import argparse
+import json
+import math
+import random
+import time
+import urllib.request
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from .. import config
+from ..types import Rectangle, Sensor
+from .homographic_projection import apply_transform, get_homography
+
+
+@dataclass
+class Person:
+    id: int
+    along: float  # Position along the long axis of the floor
+    across: float  # Position across it
+    target: float  # Preferred lane across the floor
+    direction: int  # +1 or -1 along the long axis
+    speed: float  # Floor units per second
+    phase: float  # Sway phase
+
+
+class Crowd:
+    """
+    Keeps `size` people walking across the floor, replacing those who left.
+    """
+
+    size: int
+    people: Dict[int, Person]
+
+    _floor: Rectangle
+    _vertical: bool
+    _next_id: int
+
+    def __init__(self, floor: Rectangle, size: int = 10, seed: Optional[int] = None):
+        self.size = size
+        self.people = dict()
+        self._floor = floor
+        self._vertical = floor.height >= floor.width
+        self._next_id = 1
+        self._random = random.Random(seed)
+
+    @property
+    def _length(self) -> float:
+        return self._floor.height if self._vertical else self._floor.width
+
+    @property
+    def _breadth(self) -> float:
+        return self._floor.width if self._vertical else self._floor.height
+
+    def _spawn(self, spread: bool) -> Person:
+        direction = self._random.choice((-1, 1))
+        # The initial crowd is spread over the floor, later people enter at an end
+        along = (
+            self._random.uniform(0, self._length)
+            if spread
+            else (0.0 if direction > 0 else self._length)
+        )
+        target = self._random.uniform(0.1, 0.9) * self._breadth
+        person = Person(
+            id=self._next_id,
+            along=along,
+            across=target + self._random.gauss(0, 0.05 * self._breadth),
+            target=target,
+            direction=direction,
+            # Roughly walking pace, assuming the floor is measured in cm
+            speed=self._random.uniform(80, 160),
+            phase=self._random.uniform(0, 2 * math.pi),
+        )
+        self._next_id += 1
+        return person
+
+    def step(self, dt: float, t: float) -> tuple:
+        """
+        Advances the crowd by dt seconds.
+        Returns (created, moved, deleted) lists of people.
+        """
+
+        created, moved, deleted = [], [], []
+
+        for person in list(self.people.values()):
+            person.along += person.direction * person.speed * dt
+            # Drift towards the preferred lane and sway with the steps
+            person.across += (person.target - person.across) * min(dt * 0.5, 1.0)
+            person.across += math.sin(t * 4 + person.phase) * 2.0 * dt
+
+            if not 0 <= person.along <= self._length:
+                deleted.append(self.people.pop(person.id))
+            else:
+                moved.append(person)
+
+        while len(self.people) > self.size and len(moved) > 0:
+            person = moved.pop()
+            deleted.append(self.people.pop(person.id))
+
+        while len(self.people) < self.size:
+            person = self._spawn(spread=t == 0)
+            self.people[person.id] = person
+            created.append(person)
+
+        return created, moved, deleted
+
+    def floor_position(self, person: Person) -> tuple:
+        if self._vertical:
+            return (self._floor.p1.x + person.across, self._floor.p1.y + person.along)
+        return (self._floor.p1.x + person.along, self._floor.p1.y + person.across)
+
+
+def to_events(
+    crowd: Crowd, created, moved, deleted, M_inv: np.ndarray, timestamp: int
+) -> List[dict]:
+    """
+    M_inv: Homography from floor to sensor space
+    """
+
+    people = created + moved + deleted
+    if len(people) == 0:
+        return []
+
+    points = apply_transform(
+        np.array([crowd.floor_position(p) for p in people], dtype=np.float64), M_inv
+    )
+
+    deleted_ids = {person.id for person in deleted}
+
+    events = []
+    for i, person in enumerate(people):
+        events.append(
+            {
+                "type": "DeleteTrack" if person.id in deleted_ids else "CreateTrack",
+                "timestamp": timestamp,
+                "object": {
+                    "id": person.id,
+                    "x": int(points[i][0]),
+                    "y": int(points[i][1]),
+                    "height": 175,
+                },
+            }
+        )
+
+    return events
+
+
+def http_sender(url: str, sensor: Optional[str]) -> Callable[[List[dict]], None]:
+    target = f"{url.rstrip('/')}/{sensor or ''}"
+
+    def send(events: List[dict]) -> None:
+        request = urllib.request.Request(
+            target,
+            data=json.dumps(events).encode(),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        with urllib.request.urlopen(request) as response:
+            response.read()
+
+    return send
+
+
+def in_process_sender(sensor: Optional[str]) -> Callable[[List[dict]], None]:
+    from .server import XOVISServer
+
+    server = XOVISServer()
+
+    def send(events: List[dict]) -> None:
+        # Serialize as well, so the measurement includes JSON decoding like over HTTP
+        server._notify(json.loads(json.dumps(events)), sensor)
+
+    return send
+
+
+def run(
+    crowd: Crowd,
+    send: Callable[[List[dict]], None],
+    sensor: Sensor,
+    rate: float,
+    duration: float,
+    t0: float = 0.0,
+) -> List[float]:
+    """
+    Pushes crowd updates at rate per second for duration seconds.
+    Returns the send duration of every push.
+    """
+
+    M_inv = np.linalg.inv(get_homography(src=sensor.src_points, dst=sensor.dst_points))
+
+    durations = []
+    interval = 1.0 / rate
+    start = time.perf_counter()
+    t = t0
+
+    while time.perf_counter() - start < duration:
+        created, moved, deleted = crowd.step(interval if t > 0 else 0.0, t)
+        events = to_events(
+            crowd, created, moved, deleted, M_inv, int(time.time() * 1000)
+        )
+
+        tic = time.perf_counter()
+        send(events)
+        durations.append(time.perf_counter() - tic)
+
+        t += interval
+        delay = start + (t - t0) - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+    return durations
+
+
+def _fetch_stats(api: str) -> dict:
+    with urllib.request.urlopen(f"{api.rstrip('/')}/data/fps") as response:
+        return json.loads(response.read())
+
+
+def _percentile(values: List[float], p: float) -> float:
+    values = sorted(values)
+    return values[min(int(len(values) * p), len(values) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate a crowd for XOVIS ingest")
+    parser.add_argument("--people", type=int, default=10, help="Crowd size")
+    parser.add_argument(
+        "--ramp",
+        type=lambda s: [int(n) for n in s.split(",")],
+        help="Comma separated crowd sizes to step through, e.g. 0,50,100,200",
+    )
+    parser.add_argument(
+        "--step", type=float, default=15.0, help="Seconds per ramp step"
+    )
+    parser.add_argument(
+        "--duration", type=float, default=60.0, help="Seconds to run without ramp"
+    )
+    parser.add_argument("--rate", type=float, default=10.0, help="Pushes per second")
+    parser.add_argument("--sensor", help="Sensor name to simulate, first by default")
+    parser.add_argument(
+        "--url", default="http://localhost:8081", help="XOVIS receiver to post to"
+    )
+    parser.add_argument(
+        "--in-process",
+        action="store_true",
+        help="Feed an in-process XOVISServer instead of posting over HTTP",
+    )
+    parser.add_argument(
+        "--api", help="Gangway API to read frame stats from, e.g. http://localhost:8082"
+    )
+    parser.add_argument("--seed", type=int, help="Random seed")
+    args = parser.parse_args()
+
+    sensors = {sensor.name: sensor for sensor in config.CONFIG.SENSORS}
+    sensor = sensors[args.sensor] if args.sensor else config.CONFIG.SENSORS[0]
+    path = args.sensor if args.sensor else None
+
+    send = in_process_sender(path) if args.in_process else http_sender(args.url, path)
+    crowd = Crowd(config.CONFIG.FLOOR, seed=args.seed)
+
+    steps = [(n, args.step) for n in args.ramp] if args.ramp else []
+    steps = steps or [(args.people, args.duration)]
+
+    t = 0.0
+    for size, duration in steps:
+        crowd.size = size
+        durations = run(crowd, send, sensor, args.rate, duration, t0=t)
+        t += duration
+
+        if len(durations) == 0:
+            print(f"{size:4d} people: no pushes sent, step too short for the rate")
+            continue
+
+        line = (
+            f"{size:4d} people: ingest p50 {_percentile(durations, 0.5) * 1000:6.2f} ms"
+            f"  p95 {_percentile(durations, 0.95) * 1000:6.2f} ms"
+            f"  max {max(durations) * 1000:6.2f} ms"
+        )
+        if args.api:
+            stats = _fetch_stats(args.api)
+            line += (
+                f"  | fps {stats['fps']:6.2f}  frame avg {stats['tpf_avg']:6.2f} ms"
+                f"  max {stats['tpf_max']:6.2f} ms  ups {stats['ups']}"
+            )
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
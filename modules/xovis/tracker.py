@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Constant-velocity tracking of people to extrapolate positions between XOVIS pushes
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Dict, Hashable, List, Optional, Tuple
+
+from ..latency import Stamps
+from ..types import Point
+
+
+@dataclass
+class Track:
+    x: float  # Filtered floor position
+    y: float
+    vx: float  # Floor units per second
+    vy: float
+    timestamp: float  # Sensor time of the last measurement in seconds
+    received: float  # Local time.time() of the last measurement
+
+
+class TrackSnapshot:
+    """
+    Immutable view of all tracks at one point in time. Safe to share between threads.
+    """
+
+    stamps: Optional[Stamps] = None
+
+    _tracks: Tuple[Tuple[float, float, float, float, float], ...]
+    _max_horizon: float
+
+    def __init__(self, tracks: List[Track], max_horizon: float) -> None:
+        self._tracks = tuple((t.x, t.y, t.vx, t.vy, t.received) for t in tracks)
+        self._max_horizon = max_horizon
+
+    def __len__(self) -> int:
+        return len(self._tracks)
+
+    def predict(self, at: Optional[float] = None) -> List[Point]:
+        """
+        Positions extrapolated to the local time `at` (defaults to now).
+        Extrapolation is capped at max_horizon to keep lost tracks from drifting away.
+        """
+
+        if at is None:
+            at = time.time()
+
+        points = []
+        for x, y, vx, vy, received in self._tracks:
+            dt = min(max(at - received, 0.0), self._max_horizon)
+            points.append(Point(x + vx * dt, y + vy * dt))
+
+        return points
+
+
+class Tracker:
+    """
+    Per-track alpha-beta filter (a steady-state Kalman filter for constant velocity)
+    driven by the XOVIS event timestamps. Not thread-safe, only the ingesting thread
+    may update it; readers use snapshot().
+    """
+
+    alpha: float
+    beta: float
+    max_horizon: float
+
+    _tracks: Dict[Hashable, Track]
+
+    def __init__(
+        self, alpha: float = 0.85, beta: float = 0.3, max_horizon: float = 0.5
+    ) -> None:
+        self.alpha = alpha
+        self.beta = beta
+        self.max_horizon = max_horizon
+        self._tracks = dict()
+
+    def update(
+        self, track_id: Hashable, point: Point, timestamp: int, received: float
+    ) -> None:
+        """
+        Feed a projected measurement. timestamp is the XOVIS event time in ms.
+        """
+
+        t = timestamp / 1000
+        track = self._tracks.get(track_id)
+
+        if track is None:
+            self._tracks[track_id] = Track(point.x, point.y, 0.0, 0.0, t, received)
+            return
+
+        dt = t - track.timestamp
+        if dt <= 0:
+            # Duplicate or out-of-order measurement, nothing to learn from it
+            return
+
+        # Predict
+        px = track.x + track.vx * dt
+        py = track.y + track.vy * dt
+
+        # Correct
+        rx = point.x - px
+        ry = point.y - py
+        track.x = px + self.alpha * rx
+        track.y = py + self.alpha * ry
+        track.vx += self.beta * rx / dt
+        track.vy += self.beta * ry / dt
+        track.timestamp = t
+        track.received = received
+
+    def remove(self, track_id: Hashable) -> None:
+        self._tracks.pop(track_id, None)
+
+    def snapshot(self, groups: Optional[List[List[Hashable]]] = None) -> TrackSnapshot:
+        """
+        groups: Track ids that describe the same person (see fusion.fuse). Their
+        states are averaged into a single track.
+        """
+
+        if groups is None:
+            return TrackSnapshot(list(self._tracks.values()), self.max_horizon)
+
+        tracks = []
+        for group in groups:
+            members = [self._tracks[i] for i in group if i in self._tracks]
+            if len(members) == 1:
+                tracks.append(members[0])
+            elif len(members) > 1:
+                n = len(members)
+                tracks.append(
+                    Track(
+                        x=sum(t.x for t in members) / n,
+                        y=sum(t.y for t in members) / n,
+                        vx=sum(t.vx for t in members) / n,
+                        vy=sum(t.vy for t in members) / n,
+                        timestamp=max(t.timestamp for t in members),
+                        received=max(t.received for t in members),
+                    )
+                )
+
+        return TrackSnapshot(tracks, self.max_horizon)